@@ -0,0 +1,80 @@
+"""
+Compare decoding runner items from a DynamoDB Scan through the resource
+path (TypeDeserializer + Runner.from_item) and the low-level codec
+(store.codec.runner_from_attribute_values).
+
+    python benchmarks/decode_runners.py [--items 100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda", "control_plane"))
+
+from boto3.dynamodb.types import TypeDeserializer  # noqa: E402
+
+from models import Runner, RunnerState  # noqa: E402
+from store.codec import runner_from_attribute_values  # noqa: E402
+
+
+def make_items(count: int, seed: int = 1):
+    """Wire-format items shaped like real runner records."""
+    rng = random.Random(seed)
+    now = int(time.time())
+    states = [s.value for s in RunnerState]
+    items = []
+    for i in range(count):
+        created = now - rng.randint(0, 30 * 86400)
+        item = {
+            "runner_id": {"S": f"01HZX{i:021d}"},
+            "status": {"S": rng.choice(states)},
+            "timestamp": {"N": str(created)},
+            "runner_labels": {"S": "self-hosted,class:medium,image:ubuntu:22.04"},
+            "image_tag": {"S": "ubuntu-22-04"},
+            "class_name": {"S": rng.choice(["small", "medium", "large"])},
+            "repo": {"S": f"org/repo-{rng.randint(0, 20)}"},
+            "job_id": {"S": str(rng.randint(10**9, 10**10))},
+            "workflow_job_id": {"S": str(rng.randint(10**9, 10**10))},
+            "job_status": {"S": "completed"},
+            "task_id": {"S": f"arn:aws:ecs:eu-west-1:123456789012:task/runners/{i:032x}"},
+            "started_at": {"N": str(created + 40)},
+            "last_heartbeat": {"N": str(created + 600)},
+        }
+        if rng.random() < 0.5:
+            item["completed_at"] = {"N": str(created + 900)}
+        items.append(item)
+    return items
+
+
+def resource_path(items):
+    deserialize = TypeDeserializer().deserialize
+    return [Runner.from_item({k: deserialize(v) for k, v in item.items()}) for item in items]
+
+
+def codec_path(items):
+    return [runner_from_attribute_values(item) for item in items]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    # Both paths must produce the same runners
+    assert resource_path(items[:1000]) == codec_path(items[:1000])
+
+    results = {}
+    for name, fn in (("resource", resource_path), ("codec", codec_path)):
+        best = min(timeit.repeat(lambda: fn(items), number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:<9} {best:8.3f}s  {args.items / best:>12,.0f} items/s")
+    print(f"speedup   {results['resource'] / results['codec']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
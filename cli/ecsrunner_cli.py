@@ -1,13 +1,17 @@
 import json
 import os
 from datetime import datetime
+from decimal import Decimal
 from functools import wraps
 from typing import Callable, Dict, List, Optional
 
 import boto3
 import click
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
+ACTIVE_INDEX = 'repo-active-index'
+
 
 # ---- Helpers for AWS and DynamoDB access ----
 
@@ -80,6 +84,8 @@ class Context:
         if not self.table_name:
             raise click.ClickException('RUNNER_TABLE environment variable must be set')
         self.ssm_param = os.getenv('CLASS_SIZES_PARAM')
+        self.summary_table = os.getenv('SUMMARY_TABLE', 'runner-fleet-summary')
+        self.archive_url = os.getenv('ARCHIVE_URL')
 
 pass_ctx = click.make_pass_decorator(Context)
 
@@ -119,20 +125,28 @@ def runners():
 
 @runners.command('list')
 @pass_ctx
-def list_runners(ctx):
+@click.option('--repo', help='Only live runners of this repository (owner/name)')
+def list_runners(ctx, repo):
     """List all runners and their current status."""
     table = get_dynamo_table(ctx.table_name, ctx.session)
+    kwargs = {}
+    op = table.scan
+    if repo:
+        # Per-repo reads hit the sparse active index instead of the whole table
+        kwargs = {'IndexName': ACTIVE_INDEX, 'KeyConditionExpression': Key('active_repo').eq(repo)}
+        op = table.query
     try:
-        resp = table.scan()
+        resp = op(**kwargs)
         items = resp.get('Items', [])
         while resp.get('LastEvaluatedKey'):
-            resp = table.scan(ExclusiveStartKey=resp['LastEvaluatedKey'])
+            resp = op(ExclusiveStartKey=resp['LastEvaluatedKey'], **kwargs)
             items.extend(resp.get('Items', []))
     except ClientError as e:
         raise click.ClickException(f'DynamoDB scan failed: {e}')
 
     columns = [
         ('ID', 'runner_id'),
+        ('REPO', 'repo'),
         ('STATE', 'status'),
         ('JOB', 'job_status'),
         ('STARTED', 'started_at'),
@@ -151,6 +165,68 @@ def list_runners(ctx):
 
     click.echo(format_table(items, columns, stylers))
 
+@runners.command('summary')
+@pass_ctx
+@click.option('--repo', help='Summary of one repository (owner/name)')
+def runner_summary(ctx, repo):
+    """Show runner counts per state, class and image."""
+    table = get_dynamo_table(ctx.summary_table, ctx.session)
+    key = f'repo#{repo}' if repo else 'fleet'
+    try:
+        item = table.get_item(Key={'summary_id': key}).get('Item') or {}
+    except ClientError as e:
+        raise click.ClickException(f'DynamoDB get_item failed: {e}')
+
+    # Attributes are "<kind>#<name>" counters, see store/summary_store.py
+    now = int(datetime.now().timestamp())
+    groups: Dict[str, List[Dict]] = {'state': [], 'class': [], 'image': []}
+    oldest: Dict[str, int] = {}
+    for attr, value in item.items():
+        kind, _, name = attr.partition('#')
+        if kind in groups and int(value):
+            groups[kind].append({'name': name, 'count': int(value)})
+        elif kind == 'waiting' and int(value) > 0:
+            state, _, minute = name.rpartition('#')
+            oldest[state] = min(oldest.get(state, int(minute)), int(minute))
+    for row in groups['state']:
+        if row['name'] in oldest:
+            row['oldest'] = f"{(now - oldest[row['name']]) // 60}m"
+
+    for kind, title in (('state', 'STATE'), ('class', 'CLASS'), ('image', 'IMAGE')):
+        rows = sorted(groups[kind], key=lambda r: r['name'])
+        columns = [(title, 'name'), ('COUNT', 'count')]
+        if kind == 'state':
+            columns.append(('OLDEST WAITING', 'oldest'))
+        click.echo(format_table(rows, columns))
+        click.echo()
+
+@runners.command('export')
+@pass_ctx
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Output file (JSON lines)')
+def export_runners(ctx, output):
+    """Export all runner records as JSON lines, e.g. for the fleet simulator."""
+    table = get_dynamo_table(ctx.table_name, ctx.session)
+
+    def plain(value):
+        if isinstance(value, Decimal):
+            return int(value) if value == value.to_integral_value() else float(value)
+        raise TypeError(type(value).__name__)
+
+    count = 0
+    kwargs = {}
+    try:
+        while True:
+            resp = table.scan(**kwargs)
+            for item in resp.get('Items', []):
+                output.write(json.dumps(item, default=plain) + '\n')
+                count += 1
+            if not resp.get('LastEvaluatedKey'):
+                break
+            kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    except ClientError as e:
+        raise click.ClickException(f'DynamoDB scan failed: {e}')
+    click.echo(f'Exported {count} runners', err=True)
+
 @runners.command('details')
 @pass_ctx
 @click.argument('runner_id')
@@ -179,6 +255,104 @@ def terminate_runner(ctx, task_arn, cluster):
         raise click.ClickException(f'ECS stop_task failed: {e}')
     click.secho('Task termination initiated', fg='green')
 
+# ---- Archive commands ----
+ARCHIVE_COLUMNS = 'runner_id,repo,status,runner_class,created_at,completed_at'
+
+def open_archive(url: str, session: boto3.Session):
+    """Open the Parquet archive (s3://bucket/prefix or a local directory) as a dataset."""
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.fs as pafs
+    except ImportError:
+        raise click.ClickException('Reading the archive requires pyarrow (pip install pyarrow)')
+
+    # Partition directories are date=YYYY-MM-DD/class=<class>, see store/archive_store.py
+    partitioning = ds.partitioning(pa.schema([('date', pa.string()), ('class', pa.string())]), flavor='hive')
+    if url.startswith('s3://'):
+        creds = session.get_credentials().get_frozen_credentials()
+        fs = pafs.S3FileSystem(
+            access_key=creds.access_key,
+            secret_key=creds.secret_key,
+            session_token=creds.token,
+            region=session.region_name,
+        )
+        path = f"{url[len('s3://'):].rstrip('/')}/runners"
+    else:
+        fs = pafs.LocalFileSystem()
+        path = os.path.join(os.path.abspath(url), 'runners')
+    return ds.dataset(path, format='parquet', partitioning=partitioning, filesystem=fs)
+
+@cli.group()
+def archive():
+    """Query archived (expired) runner records."""
+    pass
+
+@archive.command('query')
+@pass_ctx
+@click.option('--archive-url', help='Archive location (defaults to $ARCHIVE_URL)')
+@click.option('--since', help='First completion date, YYYY-MM-DD')
+@click.option('--until', help='Last completion date, YYYY-MM-DD')
+@click.option('--class', 'class_name', help='Runner class')
+@click.option('--repo', help='Repository (owner/name)')
+@click.option('--state', type=click.Choice(['OFFLINE', 'FAILED']), help='Final state')
+@click.option('--columns', default=ARCHIVE_COLUMNS, show_default=True, help='Comma-separated columns to read')
+@click.option('--group-by', help='Aggregate runner count and runner-minutes by this column')
+@click.option('--limit', default=100, show_default=True, help='Maximum rows to print (0 for all)')
+def archive_query(ctx, archive_url, since, until, class_name, repo, state, columns, group_by, limit):
+    """Report on archived runners without touching the live table."""
+    url = archive_url or ctx.archive_url
+    if not url:
+        raise click.ClickException('ARCHIVE_URL not set')
+    dataset = open_archive(url, ctx.session)
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    # Partition filters skip whole directories; the rest use row group statistics
+    filters = []
+    if since:
+        filters.append(ds.field('date') >= since)
+    if until:
+        filters.append(ds.field('date') <= until)
+    if class_name:
+        filters.append(ds.field('class') == class_name)
+    if repo:
+        filters.append(ds.field('repo') == repo)
+    if state:
+        filters.append(ds.field('status') == state)
+    expr = None
+    for f in filters:
+        expr = f if expr is None else expr & f
+
+    if group_by:
+        cols = [group_by, 'started_at', 'completed_at']
+    else:
+        cols = [c.strip() for c in columns.split(',') if c.strip()]
+    try:
+        table = dataset.to_table(columns=cols, filter=expr)
+    except Exception as e:
+        raise click.ClickException(f'Archive query failed: {e}')
+
+    if group_by:
+        minutes = pc.divide(pc.subtract(table['completed_at'], table['started_at']), 60)
+        table = table.append_column('runner_minutes', minutes)
+        table = table.group_by(group_by).aggregate([([], 'count_all'), ('runner_minutes', 'sum')])
+        items = sorted(table.to_pylist(), key=lambda r: -r['count_all'])
+        for item in items:
+            item['runner_minutes_sum'] = int(item['runner_minutes_sum'] or 0)
+        columns = [(group_by.upper(), group_by), ('RUNNERS', 'count_all'), ('RUNNER MINUTES', 'runner_minutes_sum')]
+        click.echo(format_table(items, columns))
+        return
+
+    items = table.to_pylist() if not limit else table.slice(0, limit).to_pylist()
+    for item in items:
+        for key in ('created_at', 'started_at', 'completed_at', 'last_heartbeat'):
+            if item.get(key) is not None:
+                item[key] = datetime.fromtimestamp(int(item[key])).isoformat(' ')
+    click.echo(format_table(items, [(c.upper(), c) for c in cols]))
+    if limit and table.num_rows > limit:
+        click.echo(f'... {table.num_rows - limit} more rows')
+
 # ---- Cluster commands ----
 @cli.group()
 def cluster():
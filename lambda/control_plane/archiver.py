@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List
+
+from aws_lambda_powertools import Logger, Tracer
+
+from config import Settings
+from models import Runner
+from store.archive_store import ArchiveStore
+from store.client_runner_store import get_runner_store
+
+
+logger = Logger(service="runner-archiver")
+tracer = Tracer(service="runner-archiver")
+settings = Settings()
+
+# Records per archive batch; one Parquet file per (date, class) in a batch
+BATCH_SIZE = 5000
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
+    """
+    Move OFFLINE/FAILED runners older than ``archive_after_days`` (or the
+    event's ``older_than_days``) to the Parquet archive. Records only get a
+    DynamoDB TTL once the batch containing them has been written, so a
+    failed write leaves them in the table for the next run.
+    """
+    if not settings.archive_url:
+        return {"statusCode": 200, "body": "archive disabled"}
+
+    now = int(time.time())
+    days = int(event.get("older_than_days", settings.archive_after_days))
+    cutoff = now - days * 86400
+    runner_store = get_runner_store(settings)
+    archive = ArchiveStore(settings)
+
+    archived = 0
+    files = 0
+
+    def flush(batch: List[Runner]) -> None:
+        nonlocal archived, files
+        uris = archive.write(batch)
+        expired = runner_store.expire([r.id for r in batch], now + settings.archive_grace_seconds)
+        archived += expired
+        files += len(uris)
+        logger.info("Archived runner batch", extra={"runners": len(batch), "expired": expired, "files": uris})
+
+    batch: List[Runner] = []
+    for runner in runner_store.list_archivable(cutoff):
+        batch.append(runner)
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    return {
+        "statusCode": 200,
+        "body": f"archived={archived} files={files} cutoff={cutoff}",
+    }
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+from config import Settings
+from models import Runner, RunnerState
+from runner_controller import RunnerController
+from store.client_runner_store import ClientRunnerStore
+from store.runner_store import RunnerStore
+from utilities import images as img_utils, github as gh_utils
+from utilities.backpressure import is_deferrable
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+# Blocking calls one launch can have in flight at once (JIT, image, task def)
+CALLS_PER_LAUNCH = 3
+
+
+class AsyncRunnerEngine:
+    """
+    Asyncio launch path on top of a :class:`RunnerController`.
+
+    Blocking boto3 and GitHub calls run in worker threads (botocore clients,
+    the backpressure layer and the GitHub client are thread-safe), so
+    independent calls of one launch overlap: the JIT registration runs
+    alongside the ECR image and ECS task definition lookups. Batches fan out
+    with at most ``launch_concurrency`` launches in flight.
+    """
+
+    def __init__(self, controller: RunnerController, concurrency: int):
+        self.controller = controller
+        self.settings = controller.settings
+        self.concurrency = max(1, concurrency)
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Run ``coro`` to completion on a thread pool sized for the fan-out."""
+        async def main() -> T:
+            # The default pool (cpu count + 4 threads) would cap the overlap
+            pool = ThreadPoolExecutor(max_workers=self.concurrency * CALLS_PER_LAUNCH)
+            asyncio.get_running_loop().set_default_executor(pool)
+            return await coro
+
+        return asyncio.run(main())
+
+    @staticmethod
+    async def _call(fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.to_thread(fn, *args)
+
+    async def provision(self, runner: Runner, base_image: str, build_missing: bool = True) -> Runner:
+        """
+        Async equivalent of :meth:`RunnerController._provision`. With
+        ``build_missing`` False (the image was just built), a missing image
+        is an error instead of queuing another build.
+        """
+        c = self.controller
+        tag = runner.image
+        repo = runner.repo or self.settings.github_repo
+        family = c._task_family(tag)
+
+        # Speculative: nearly every launch finds its image, and if it does
+        # not, the registration is deleted again below.
+        jit = asyncio.create_task(self._call(
+            gh_utils.create_jit_runner, self.settings, runner.id, runner.labels.split(","), repo
+        ))
+        try:
+            image_uri, task_def = await asyncio.gather(
+                self._call(c._resolve_image_uri, tag),
+                self._call(c._lookup_task_definition, family),
+            )
+            if image_uri is None:
+                await self._discard(jit, repo)
+                if not build_missing:
+                    raise RuntimeError(f"Image for tag {tag} not found in ECR")
+                logger.info("Image %s not found in ECR, queuing build", tag)
+                runner.state = RunnerState.IMAGE_CREATING
+                await self._call(c.runner_store.save, runner)
+                await self._call(c._build_image_async, base_image, tag, runner.id)
+                return runner
+
+            if task_def is None:
+                task_def = await self._call(c._register_task_definition, family, image_uri)
+            _, jit_config = await jit
+            task_id = await self._call(c._run_task, task_def, jit_config, runner.id, runner.runner_class, repo)
+        except BaseException as exc:
+            await self._discard(jit, repo)
+            if isinstance(exc, Exception) and is_deferrable(exc):
+                return await self._call(c._defer, runner, exc)
+            raise
+
+        runner.state = RunnerState.WAITING_FOR_JOB
+        runner.task_id = task_id
+        runner.started_at = int(time.time())
+        await self._call(c.runner_store.save, runner)
+        return runner
+
+    async def _discard(self, jit: asyncio.Task, repo: str) -> None:
+        """Delete a speculative JIT registration whose runner will not start."""
+        if jit.done() and (jit.cancelled() or jit.exception() is not None):
+            return
+        try:
+            runner_id, _ = await jit
+        except Exception:
+            logger.exception("Failed to discard JIT runner registration")
+            return
+        await self._call(self.controller._discard_jit_runner, runner_id, repo)
+
+    async def launch_admitted(self, runner: Runner) -> Runner:
+        runner.state = RunnerState.STARTING
+        await self._call(self.controller.runner_store.save, runner)
+        try:
+            return await self.provision(runner, self._base_image(runner))
+        except Exception:
+            await self._call(self.controller._fail_launch, runner)
+            raise
+
+    async def resume(self, runner_id: str) -> Runner:
+        runner = await self._call(self.controller.runner_store.get_runner, runner_id)
+        if runner is None:
+            raise RuntimeError(f"Runner {runner_id} not found")
+        if runner.state != RunnerState.DEFERRED:
+            raise RuntimeError(f"Runner {runner_id} state is {runner.state}")
+        return await self.provision(runner, self._base_image(runner))
+
+    @staticmethod
+    def _base_image(runner: Runner) -> str:
+        return img_utils.base_image_from_labels(runner.labels) or runner.image
+
+    async def fan_out(self, fn: Callable[[T], Awaitable[Runner]], items: Iterable[T]) -> List[Optional[Runner]]:
+        """Run ``fn`` over ``items`` with bounded concurrency; failures yield None."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(item: T) -> Optional[Runner]:
+            async with semaphore:
+                try:
+                    return await fn(item)
+                except Exception:
+                    logger.exception("Batch launch failed for %s", getattr(item, "id", item))
+                    return None
+
+        return list(await asyncio.gather(*(one(item) for item in items)))
+
+
+class AsyncRunnerController(RunnerController):
+    """
+    Synchronous facade over :class:`AsyncRunnerEngine` for the services and
+    the janitor: same interface as :class:`RunnerController`, with launches
+    and batches (pending drains, deferred resumes) run concurrently.
+    """
+
+    def __init__(self, settings: Settings, runner_store: RunnerStore = None, **kwargs):
+        # The resource Table is not thread-safe; the client store is
+        super().__init__(settings, runner_store or ClientRunnerStore(settings), **kwargs)
+        self.engine = AsyncRunnerEngine(self, settings.launch_concurrency)
+
+    def _provision(self, runner: Runner, base_image: str) -> Runner:
+        return self.engine.run(self.engine.provision(runner, base_image))
+
+    def start_runner(self, runner_id: str) -> Runner:
+        runner = self._built_runner(runner_id)
+        if runner.state == RunnerState.OFFLINE:
+            logger.info("Runner %s was reclaimed while its image was building", runner_id)
+            return runner
+        return self.engine.run(self.engine.provision(runner, runner.image, build_missing=False))
+
+    def drain_pending(self, limit: Optional[int] = None) -> int:
+        if not self.scheduler:
+            return 0
+        admitted = self.scheduler.drain(limit)
+        if not admitted:
+            return 0
+        results = self.engine.run(self.engine.fan_out(self.engine.launch_admitted, admitted))
+        return sum(1 for r in results if r is not None)
+
+    def resume_runners(self, runner_ids: List[str]) -> int:
+        if not runner_ids:
+            return 0
+        results = self.engine.run(self.engine.fan_out(self.engine.resume, runner_ids))
+        return sum(1 for r in results if r is not None and r.state != RunnerState.DEFERRED)
+
+
+def get_controller(settings: Settings) -> RunnerController:
+    """The controller for the configured ``controller_engine``."""
+    if settings.controller_engine == "async":
+        return AsyncRunnerController(settings)
+    return RunnerController(settings)
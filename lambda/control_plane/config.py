@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import os
 from functools import cache
 from typing import Any, List
 
@@ -9,6 +10,9 @@ from botocore.config import Config as BotoConfig
 from pydantic_settings import BaseSettings, SettingsConfigDict, EnvSettingsSource
 from pydantic import Field, field_validator
 
+from utilities.backpressure import ThrottledClient
+from utilities.fault_injection import ThrottlingFaultInjector
+
 
 class Settings(BaseSettings):
     """Environment configuration loaded from variables."""
@@ -16,9 +20,14 @@ class Settings(BaseSettings):
     cluster: str = Field(..., env="CLUSTER")
     subnets: List[str] = Field(..., env="SUBNETS")
     security_groups: List[str] = Field(..., env="SECURITY_GROUPS")
-    github_pat: str = Field(..., env="GITHUB_PAT")
-    github_repo: str = Field(..., env="GITHUB_REPO")
+    github_pat: str | None = Field(None, env="GITHUB_PAT")
+    github_app_id: str | None = Field(None, env="GITHUB_APP_ID")
+    github_app_private_key: str | None = Field(None, env="GITHUB_APP_PRIVATE_KEY")
+    github_app_installation_id: int | None = Field(None, env="GITHUB_APP_INSTALLATION_ID")
+    github_repo: str | None = Field(None, env="GITHUB_REPO")
+    github_repos: List[str] = Field(default_factory=list, env="GITHUB_REPOS")
     github_webhook_secret: str = Field(..., env="GITHUB_WEBHOOK_SECRET")
+    runner_group_id: int = Field(1, env="RUNNER_GROUP_ID")
     runner_table: str = Field(..., env="RUNNER_TABLE")
     class_sizes_param: str | None = Field(None, env="CLASS_SIZES_PARAM")
     execution_role_arn: str = Field(..., env="EXECUTION_ROLE_ARN")
@@ -29,23 +38,61 @@ class Settings(BaseSettings):
     runner_image_tag: str = Field("latest", env="RUNNER_IMAGE_TAG")
     image_build_project: str | None = Field(None, env="IMAGE_BUILD_PROJECT")
     runner_ttl_seconds: int = Field(7200, env="RUNNER_TTL_SECONDS")
+    idle_timeout_seconds: int = Field(900, env="IDLE_TIMEOUT_SECONDS")
+    heartbeat_interval_seconds: int = Field(60, env="HEARTBEAT_INTERVAL_SECONDS")
+    heartbeat_timeout_seconds: int = Field(300, env="HEARTBEAT_TIMEOUT_SECONDS")
+    quota_table: str | None = Field(None, env="QUOTA_TABLE")
+    quotas_param: str | None = Field(None, env="QUOTAS_PARAM")
+    inline_drain_limit: int = Field(2, env="INLINE_DRAIN_LIMIT")
+    controller_engine: str = Field("async", env="CONTROLLER_ENGINE")
+    launch_concurrency: int = Field(8, env="LAUNCH_CONCURRENCY")
+    runner_store_backend: str = Field("client", env="RUNNER_STORE_BACKEND")
+    summary_table: str | None = Field(None, env="SUMMARY_TABLE")
+    archive_url: str | None = Field(None, env="ARCHIVE_URL")
+    archive_after_days: int = Field(30, env="ARCHIVE_AFTER_DAYS")
+    archive_grace_seconds: int = Field(86400, env="ARCHIVE_GRACE_SECONDS")
+    dedupe_table: str | None = Field(None, env="DEDUPE_TABLE")
+    dedupe_ttl_seconds: int = Field(86400, env="DEDUPE_TTL_SECONDS")
 
-    @field_validator("subnets", "security_groups", mode="before")
+    @field_validator("subnets", "security_groups", "github_repos", mode="before")
     @classmethod
     def _split_csv(cls, v: str | List[str]) -> List[str]:
         if isinstance(v, str):
             return [p for p in v.split(",") if p]
         return v
 
+    def serves_repo(self, repo: str | None) -> bool:
+        """
+        Whether webhooks for ``repo`` are handled. ``github_repos`` entries
+        are ``owner/name`` or ``owner/*`` for a whole organization;
+        ``github_repo`` is the single-repository setting.
+        """
+        if not repo:
+            return False
+        if repo == self.github_repo:
+            return True
+        owner = repo.split("/", 1)[0]
+        return any(p == repo or p == f"{owner}/*" for p in self.github_repos)
+
+    @field_validator("github_app_installation_id", mode="before")
+    @classmethod
+    def _empty_as_none(cls, v: Any) -> Any:
+        return None if v == "" else v
+
     model_config = SettingsConfigDict(case_sensitive=False, env_file=".env", enable_decoding=False)
 
 _session = boto3.Session()
-_retry_cfg = BotoConfig(retries={"max_attempts": 5, "mode": "standard"})
+# Adaptive mode adds botocore's client-side rate limiting on top of retries
+_retry_cfg = BotoConfig(retries={"max_attempts": 5, "mode": "adaptive"})
 
 
 def client(service: str):
-    """Create a boto3 client with retry config."""
-    return _session.client(service, config=_retry_cfg)
+    """Create a boto3 client with retry config and client-side backpressure."""
+    raw = _session.client(service, config=_retry_cfg)
+    throttle_rate = float(os.environ.get("FAULT_INJECT_THROTTLE_RATE") or 0)
+    if throttle_rate:
+        raw = ThrottlingFaultInjector(raw, throttle_rate)
+    return ThrottledClient(raw, service)
 
 
 def resource(service: str):
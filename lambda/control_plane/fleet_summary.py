@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from aws_lambda_powertools import Logger, Tracer
+from boto3.dynamodb.types import TypeDeserializer
+
+from config import Settings
+from models import Runner
+from store.client_runner_store import ClientRunnerStore
+from store.summary_store import SUMMARY_ATTRIBUTES, SummaryStore
+
+
+logger = Logger(service="runner-fleet-summary")
+tracer = Tracer(service="runner-fleet-summary")
+settings = Settings()
+summary_store = SummaryStore(settings)
+_deserializer = TypeDeserializer()
+
+
+def _image(record: Dict[str, Any], key: str) -> Optional[Runner]:
+    image = record.get("dynamodb", {}).get(key)
+    if not image:
+        return None
+    return Runner.from_item({k: _deserializer.deserialize(v) for k, v in image.items()})
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
+    """
+    Consume the runner table's stream (NEW_AND_OLD_IMAGES) and keep the
+    fleet summary items up to date. Invoke with ``{"rebuild": true}`` to
+    recompute them from a full table scan, e.g. right after enabling it.
+    """
+    if event.get("rebuild"):
+        # Only the attributes the summary counts are read
+        runners = ClientRunnerStore(settings).scan(projection=SUMMARY_ATTRIBUTES)
+        summary_store.rebuild(runners)
+        return {"statusCode": 200, "body": "summary rebuilt"}
+
+    failures: List[Dict[str, str]] = []
+    applied = skipped = 0
+    for record in event.get("Records", []):
+        ddb = record.get("dynamodb", {})
+        try:
+            runner_id = _deserializer.deserialize(ddb["Keys"]["runner_id"])
+            if summary_store.apply(runner_id, ddb["SequenceNumber"], _image(record, "OldImage"), _image(record, "NewImage")):
+                applied += 1
+            else:
+                skipped += 1
+        except Exception:
+            logger.exception("Failed to apply stream record", extra={"event_id": record.get("eventID")})
+            # Records of a runner must apply in order: retry from here
+            failures.append({"itemIdentifier": ddb.get("SequenceNumber", "")})
+            break
+
+    logger.info("Fleet summary updated", extra={"applied": applied, "replayed": skipped})
+    return {"batchItemFailures": failures}
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 
 from aws_lambda_powertools import Logger, Tracer
 
 from config import Settings, resource
-from models import Runner, RunnerState
+from models import Runner, RunnerState, TERMINAL_STATES
+from reaper import RunnerReaper
+from async_controller import get_controller
 from runner_controller import RunnerController
 
 
@@ -15,70 +17,122 @@ tracer = Tracer(service="runner-janitor")
 settings = Settings()
 
 
+def _runners(event: Dict[str, Any], controller: RunnerController) -> Iterator[Runner]:
+    """
+    Runners to reconcile. By default only live runners are read from the
+    per-repo active index (optionally a single ``repo``); ``full_scan``
+    walks the whole table, e.g. once to backfill records written before
+    the index existed or to release quota still held by terminal records
+    written before releases were transactional.
+    """
+    if not event.get("full_scan"):
+        yield from controller.runner_store.list_active(event.get("repo"))
+        return
+
+    table = resource("dynamodb").Table(settings.runner_table)
+    scan_kwargs: Dict[str, Any] = {}
+    while True:
+        resp = table.scan(**scan_kwargs)
+        for item in resp.get("Items", []):
+            runner = Runner.from_item(item)
+            if runner.repo is None and settings.github_repo:
+                # Backfill the repo so the record joins the active index
+                runner.repo = settings.github_repo
+                controller.runner_store.save(runner)
+            if runner.state not in TERMINAL_STATES:
+                yield runner
+            elif runner.quota_vcpus is not None:
+                logger.info("Releasing leaked quota", extra={"runner_id": runner.id})
+                try:
+                    controller.save_terminal(runner)
+                except Exception:
+                    logger.exception("Janitor failed to release quota", extra={"runner_id": runner.id})
+        if not resp.get("LastEvaluatedKey"):
+            break
+        scan_kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
-    controller = RunnerController(settings)
-    table = resource("dynamodb").Table(settings.runner_table)
+    controller = get_controller(settings)
+    reaper = RunnerReaper(settings, controller)
 
     now = int(time.time())
     ttl = settings.runner_ttl_seconds
 
     scanned = 0
     cleaned = 0
+    reaped = 0
+    deferred = []
 
-    exclusive_start_key = None
-    while True:
-        scan_kwargs: Dict[str, Any] = {}
-        if exclusive_start_key:
-            scan_kwargs["ExclusiveStartKey"] = exclusive_start_key
-        resp = table.scan(**scan_kwargs)
-        items = resp.get("Items", [])
-        scanned += len(items)
+    for runner in _runners(event, controller):
+        scanned += 1
+        age = now - (runner.created_at or now)
+        if age < ttl:
+            if runner.state == RunnerState.DEFERRED:
+                # Retried below as one batch
+                deferred.append(runner.id)
+            else:
+                try:
+                    if reaper.reap(runner, now):
+                        reaped += 1
+                except Exception:
+                    logger.exception("Janitor failed to reap runner", extra={"runner_id": runner.id})
+            continue
 
-        for item in items:
-            runner = Runner.from_item(item)
-            age = now - (runner.created_at or now)
-            if age < ttl:
-                continue
-
-            try:
-                # Determine if this runner should be marked as FAILED vs OFFLINE
-                should_fail = runner.state in {
-                    RunnerState.IMAGE_CREATING,
-                    RunnerState.STARTING,
-                    RunnerState.WAITING_FOR_JOB,
-                    RunnerState.RUNNING,
-                }
-
-                if runner.task_id:
-                    # Stop any lingering task first
-                    controller.terminate_runner(runner.id)
-                    if should_fail and runner.state == RunnerState.RUNNING:
-                        # Explicitly fail long-running tasks beyond TTL
-                        controller.update_runner_state(runner.id, RunnerState.FAILED)
-                else:
-                    # No task running: mark according to state
-                    controller.update_runner_state(
-                        runner.id, RunnerState.FAILED if should_fail else RunnerState.OFFLINE
-                    )
-                cleaned += 1
-            except Exception:
-                logger.exception(
-                    "Janitor failed to reconcile runner",
-                    extra={
-                        "runner_id": runner.id,
-                        "state": getattr(runner.state, "value", runner.state),
-                        "task_id": runner.task_id,
-                        "age": age,
-                    },
+        try:
+            # Determine if this runner should be marked as FAILED vs OFFLINE
+            should_fail = runner.state in {
+                RunnerState.IMAGE_CREATING,
+                RunnerState.STARTING,
+                RunnerState.DEFERRED,
+                RunnerState.PENDING,
+                RunnerState.WAITING_FOR_JOB,
+                RunnerState.RUNNING,
+            }
+
+            if runner.task_id:
+                # Stop any lingering task first
+                controller.terminate_runner(runner.id)
+                if should_fail and runner.state == RunnerState.RUNNING:
+                    # Explicitly fail long-running tasks beyond TTL
+                    controller.update_runner_state(runner.id, RunnerState.FAILED)
+            else:
+                # No task running: mark according to state
+                controller.update_runner_state(
+                    runner.id, RunnerState.FAILED if should_fail else RunnerState.OFFLINE
                 )
+            cleaned += 1
+        except Exception:
+            logger.exception(
+                "Janitor failed to reconcile runner",
+                extra={
+                    "runner_id": runner.id,
+                    "state": getattr(runner.state, "value", runner.state),
+                    "task_id": runner.task_id,
+                    "age": age,
+                },
+            )
 
-        exclusive_start_key = resp.get("LastEvaluatedKey")
-        if not exclusive_start_key:
-            break
+    # Retry launches parked while ECS was throttling
+    try:
+        resumed = controller.resume_runners(deferred)
+    except Exception:
+        logger.exception("Janitor failed to resume deferred runners")
+        resumed = 0
+
+    # Terminal transitions only launch a few pending runners inline
+    try:
+        admitted = controller.drain_pending()
+    except Exception:
+        logger.exception("Janitor failed to drain pending runners")
+        admitted = 0
 
     return {
         "statusCode": 200,
-        "body": f"scanned={scanned} cleaned={cleaned} ttl={ttl}",
+        "body": (
+            f"scanned={scanned} cleaned={cleaned} resumed={resumed} reaped={reaped} "
+            f"admitted={admitted} ttl={ttl}"
+        ),
     }
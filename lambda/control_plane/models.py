@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import time
 from dataclasses import dataclass, field
+from decimal import Decimal
 from enum import Enum
 from typing import Optional
 
@@ -18,23 +19,36 @@ class RunnerState(str, Enum):
     RUNNING = "RUNNING"
     IMAGE_CREATING = "IMAGE_CREATING"
     STARTING = "STARTING"
+    DEFERRED = "DEFERRED"
+    PENDING = "PENDING"
     OFFLINE = "OFFLINE"
 
 
-@dataclass
+# Terminal states: runners in them drop out of the per-repo active index
+TERMINAL_STATES = frozenset({RunnerState.OFFLINE, RunnerState.FAILED})
+
+
+# slots: no per-instance __dict__, smaller and faster when decoding big scans
+@dataclass(slots=True)
 class Runner:
     id: str
     state: RunnerState
     labels: str
     image: Optional[str] = None
     created_at: int = field(default_factory=lambda: int(time.time()))
+    # Task launch, job start (RUNNING) and job end (COMPLETED, else OFFLINE/FAILED)
     started_at: Optional[int] = None
+    job_started_at: Optional[int] = None
     completed_at: Optional[int] = None
     runner_class: Optional[str] = None
     workflow_id: Optional[str] = None
     job_id: Optional[str] = None
     job_status: Optional[str] = None
     task_id: Optional[str] = None
+    last_heartbeat: Optional[int] = None
+    repo: Optional[str] = None
+    quota_vcpus: Optional[Decimal] = None
+    expires_at: Optional[int] = None
 
     def to_item(self) -> dict:
         item = {
@@ -48,6 +62,8 @@ class Runner:
             item["image_tag"] = self.image
         if self.started_at is not None:
             item["started_at"] = self.started_at
+        if self.job_started_at is not None:
+            item["job_started_at"] = self.job_started_at
         if self.completed_at is not None:
             item["completed_at"] = self.completed_at
         if self.runner_class:
@@ -60,6 +76,21 @@ class Runner:
             item["job_status"] = self.job_status
         if self.task_id:
             item["task_id"] = self.task_id
+        if self.last_heartbeat is not None:
+            item["last_heartbeat"] = self.last_heartbeat
+        if self.repo:
+            item["repo"] = self.repo
+            if self.state not in TERMINAL_STATES:
+                # Sparse index key: only live runners are partitioned by repo
+                item["active_repo"] = self.repo
+            if self.state == RunnerState.PENDING:
+                # Sparse index key: the per-repo quota waiting queue
+                item["pending_repo"] = self.repo
+        if self.quota_vcpus is not None:
+            item["quota_vcpus"] = self.quota_vcpus
+        if self.expires_at is not None:
+            # DynamoDB TTL, set once the record has been archived
+            item["expires_at"] = self.expires_at
         return item
 
     @classmethod
@@ -76,10 +107,15 @@ class Runner:
             image=item.get("image_tag"),
             created_at=item.get("timestamp", int(time.time())),
             started_at=item.get("started_at"),
+            job_started_at=item.get("job_started_at"),
             completed_at=item.get("completed_at"),
             runner_class=item.get("class_name"),
             workflow_id=item.get("workflow_job_id"),
             job_id=item.get("job_id"),
             job_status=item.get("job_status"),
             task_id=item.get("task_id"),
+            last_heartbeat=item.get("last_heartbeat"),
+            repo=item.get("repo"),
+            quota_vcpus=item.get("quota_vcpus"),
+            expires_at=item.get("expires_at"),
         )
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from decimal import Decimal
+from functools import cache
+from typing import Any, Deque, Dict, List, Optional
+
+from config import Settings, client, get_class_sizes
+from models import Runner
+from store.quota_store import QuotaStore
+from store.runner_store import RunnerStore
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Task definition default when a class has no size
+DEFAULT_CPU_UNITS = 1024
+
+# Pending runners admitted per drain unless the caller asks for fewer
+DEFAULT_DRAIN_LIMIT = 50
+
+
+@cache
+def get_quotas(quotas_param: str | None) -> dict[str, Any]:
+    """Fetch and cache quota definitions from SSM."""
+    if not quotas_param:
+        return {}
+    ssm_client = client("ssm")
+    resp = ssm_client.get_parameter(Name=quotas_param)
+    return json.loads(resp["Parameter"]["Value"])
+
+
+class QuotaScheduler:
+    """
+    Fair-share admission control for runner launches.
+
+    Quotas come from the ``QUOTAS_PARAM`` JSON document, with optional
+    ``default`` entries per section::
+
+        {
+          "repos":   {"default": {"max_runners": 20, "vcpus": 40, "weight": 1},
+                      "org/app": {"weight": 3}},
+          "classes": {"large": {"max_runners": 10, "vcpus": 40}},
+          "labels":  {"self-hosted,image:ubuntu:22.04": {"max_runners": 5}}
+        }
+
+    Runners over quota wait as PENDING. When capacity is released, pending
+    runners are admitted in weighted fair order: the next runner comes from
+    the repo with the fewest admitted runners per unit of weight, oldest first.
+    """
+
+    SECTIONS = (("repos", "repo"), ("classes", "class"), ("labels", "labels"))
+
+    def __init__(self, settings: Settings, runner_store: RunnerStore, quota_store: QuotaStore = None):
+        self.settings = settings
+        self.runner_store = runner_store
+        self.quota_store = quota_store or QuotaStore(settings)
+
+    # ---- quota model ----
+
+    def vcpus(self, runner: Runner) -> Decimal:
+        sizes = get_class_sizes(self.settings.class_sizes_param)
+        size = sizes.get(runner.runner_class) or {}
+        return Decimal(str(size.get("cpu", DEFAULT_CPU_UNITS))) / Decimal(1024)
+
+    def _entry(self, section: str, key: str) -> Dict[str, Any]:
+        conf = get_quotas(self.settings.quotas_param).get(section, {})
+        return {**conf.get("default", {}), **conf.get(key, {})}
+
+    def weight(self, repo: Optional[str]) -> float:
+        return float(self._entry("repos", repo or "").get("weight", 1)) or 1.0
+
+    def scopes(self, runner: Runner) -> Dict[str, Dict[str, Any]]:
+        """Counter scopes for a runner with their limits (possibly none)."""
+        keys = {
+            "repos": runner.repo or "",
+            "classes": runner.runner_class or "",
+            "labels": ",".join(sorted(runner.labels.split(","))) if runner.labels else "",
+        }
+        # Every scope is counted even without limits, so release always
+        # mirrors admission when the quota document changes in between.
+        return {
+            f"{prefix}#{keys[section]}": self._entry(section, keys[section])
+            for section, prefix in self.SECTIONS
+            if keys[section]
+        }
+
+    # ---- admission ----
+
+    def admit(self, runner: Runner) -> bool:
+        """Take quota for a runner. Return False if it has to wait."""
+        vcpus = self.vcpus(runner)
+        if not self.quota_store.acquire(runner.id, vcpus, self.scopes(runner), runner.state.value):
+            return False
+        runner.quota_vcpus = vcpus
+        return True
+
+    def release(self, runner: Runner) -> bool:
+        """
+        Give back the quota held by a runner that went terminal, saving its
+        record in the same transaction. Return False, saving nothing, if it
+        held no quota.
+        """
+        if runner.quota_vcpus is None:
+            return False
+        vcpus = Decimal(str(runner.quota_vcpus))
+        item = runner.to_item()
+        del item["quota_vcpus"]
+        released = self.quota_store.release(item, vcpus, list(self.scopes(runner)))
+        runner.quota_vcpus = None
+        return released
+
+    def drain(self, limit: Optional[int] = None) -> List[Runner]:
+        """
+        Admit up to ``limit`` (default :data:`DEFAULT_DRAIN_LIMIT`) pending
+        runners as the quotas allow, in weighted fair order across repos.
+        Returns the admitted runners, to be launched.
+        """
+        limit = limit or DEFAULT_DRAIN_LIMIT
+        pending = sorted(self.runner_store.list_pending(), key=lambda r: int(r.created_at))
+        if not pending:
+            return []
+
+        now = int(time.time())
+        queues: Dict[str, Deque[Runner]] = OrderedDict()
+        for runner in pending:
+            queues.setdefault(runner.repo or "", deque()).append(runner)
+        self.report(queues, now)
+
+        usage = {
+            repo: float(self.quota_store.usage(f"repo#{repo}")["runners"]) if repo else 0.0
+            for repo in queues
+        }
+        admitted: List[Runner] = []
+        while queues and len(admitted) < limit:
+            repo = min(queues, key=lambda r: (usage[r] / self.weight(r), int(queues[r][0].created_at)))
+            runner = queues[repo].popleft()
+            if not queues[repo]:
+                del queues[repo]
+            if not self.admit(runner):
+                continue
+            usage[repo] += 1
+            admitted.append(runner)
+            logger.info(
+                "Admitted pending runner",
+                extra={"runner_id": runner.id, "repo": repo, "wait_seconds": now - int(runner.created_at)},
+            )
+        return admitted
+
+    @staticmethod
+    def report(queues: Dict[str, Deque[Runner]], now: int) -> None:
+        """Log pending queue depth and oldest wait per tenant."""
+        for repo, queue in queues.items():
+            logger.info(
+                "Pending runner queue",
+                extra={
+                    "repo": repo,
+                    "queue_depth": len(queue),
+                    "oldest_wait_seconds": now - min(int(r.created_at) for r in queue),
+                },
+            )
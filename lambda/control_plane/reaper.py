@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from config import Settings, get_class_sizes
+from models import Runner, RunnerState
+from runner_controller import RunnerController
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class RunnerReaper:
+    """
+    Stops runners well before the janitor TTL:
+
+    * ``WAITING_FOR_JOB`` runners idle longer than their class threshold
+      (``idle_timeout`` in the class sizes parameter, else ``idle_timeout_seconds``).
+    * ``WAITING_FOR_JOB``/``RUNNING`` runners whose heartbeats stopped for
+      longer than ``heartbeat_timeout_seconds``. Only runners that sent at
+      least one heartbeat are judged on it.
+    """
+
+    def __init__(self, settings: Settings, controller: RunnerController):
+        self.settings = settings
+        self.controller = controller
+
+    def idle_timeout(self, class_name: Optional[str]) -> int:
+        sizes = get_class_sizes(self.settings.class_sizes_param)
+        size = sizes.get(class_name) or {}
+        return int(size.get("idle_timeout") or self.settings.idle_timeout_seconds)
+
+    def reap(self, runner: Runner, now: int) -> bool:
+        """Stop the runner if it is idle or dead. Return True if it was reaped."""
+        if runner.state not in (RunnerState.WAITING_FOR_JOB, RunnerState.RUNNING):
+            return False
+
+        if runner.last_heartbeat is not None:
+            silent = now - runner.last_heartbeat
+            if silent > self.settings.heartbeat_timeout_seconds:
+                logger.info("Reaping runner %s: no heartbeat for %ss", runner.id, silent)
+                self.controller.terminate_runner(runner.id, reason="Runner heartbeat lost")
+                if runner.state == RunnerState.RUNNING:
+                    self.controller.update_runner_state(runner.id, RunnerState.FAILED)
+                return True
+
+        if runner.state == RunnerState.WAITING_FOR_JOB:
+            idle = now - (runner.started_at or runner.created_at or now)
+            if idle > self.idle_timeout(runner.runner_class):
+                logger.info("Reaping runner %s: idle for %ss", runner.id, idle)
+                self.controller.terminate_runner(runner.id, reason="Runner idle timeout")
+                return True
+
+        return False
@@ -1,17 +1,36 @@
 import logging
 import os
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List
 
 from botocore.exceptions import ClientError
 
-from models import Runner, RunnerState
+from models import Runner, RunnerState, TERMINAL_STATES
 from config import Settings, client, get_class_sizes
+from quota_scheduler import QuotaScheduler
+from store.client_runner_store import get_runner_store
 from store.runner_store import RunnerStore
 from utilities import images as img_utils, github as gh_utils
+from utilities.backpressure import is_deferrable
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# States in which a runner has not picked up a job yet and can be reclaimed
+IDLE_STATES = frozenset({
+    RunnerState.PENDING,
+    RunnerState.STARTING,
+    RunnerState.DEFERRED,
+    RunnerState.IMAGE_CREATING,
+    RunnerState.WAITING_FOR_JOB,
+})
+
+# Process-wide lookup caches shared by every repo served from this Lambda.
+# Only positive results are cached: an image or task definition never
+# disappears under a running control plane, but a missing one may appear.
+_image_uris: Dict[str, str] = {}
+_task_definitions: Dict[str, str] = {}
+
 
 class RunnerController:
     """
@@ -28,39 +47,161 @@ class RunnerController:
             codebuild_client=None,
     ):
         self.settings = settings
-        self.runner_store = runner_store or RunnerStore(settings)
+        self.runner_store = runner_store or get_runner_store(settings)
         self.ecr = ecr_client or client("ecr")
         self.ecs = ecs_client or client("ecs")
         self.codebuild = codebuild_client or (
             client("codebuild") if settings.image_build_project else None
         )
+        self.scheduler = (
+            QuotaScheduler(settings, self.runner_store) if settings.quota_table else None
+        )
 
         # Pre-calc repository name
         self._repo_name = settings.runner_repository_url.rsplit("/", 1)[-1]
 
     def new_runner(
-            self, labels: str, base_image: str, class_name: str | None
+            self,
+            labels: str,
+            base_image: str,
+            class_name: str | None,
+            job_id: str | None = None,
+            workflow_id: str | None = None,
+            repo: str | None = None,
     ) -> Runner:
         """
-        Create a new Runner record and either:
+        Create a new Runner record for ``repo`` (default: ``github_repo``) and either:
           1) Trigger an image build (if not present) -> IMAGE_CREATING
-          2) Launch an ECS task immediately       -> RUNNING
+          2) Launch an ECS task immediately       -> WAITING_FOR_JOB
+          3) Defer the launch under AWS throttling -> DEFERRED
+          4) Queue it when its repo/class/labels are over quota -> PENDING
         """
         tag = img_utils.sanitize_image_label(base_image)
-        runner = self.runner_store.new_runner(labels, tag, class_name)
-
-        image_uri = self._resolve_image_uri(tag)
-        if image_uri is None:
-            logger.info("Image %s not found in ECR, queuing build", tag)
-            runner.state = RunnerState.IMAGE_CREATING
+        runner = self.runner_store.new_runner(labels, tag, class_name, job_id, workflow_id, repo)
+        if self.scheduler and not self.scheduler.admit(runner):
+            logger.info("Runner %s over quota, queuing", runner.id)
+            runner.state = RunnerState.PENDING
             self.runner_store.save(runner)
-            self._build_image_async(base_image, tag, runner.id)
             return runner
+        if not self.scheduler:
+            return self._provision(runner, base_image)
+        return self._launch_admitted(runner, base_image)
+
+    def drain_pending(self, limit: Optional[int] = None) -> int:
+        """Launch up to ``limit`` pending runners for which quota is available again."""
+        if not self.scheduler:
+            return 0
+        launched = 0
+        for runner in self.scheduler.drain(limit):
+            try:
+                runner.state = RunnerState.STARTING
+                self.runner_store.save(runner)
+                base_image = img_utils.base_image_from_labels(runner.labels) or runner.image
+                self._launch_admitted(runner, base_image)
+                launched += 1
+            except Exception:
+                logger.exception("Failed to launch admitted runner %s", runner.id)
+        return launched
+
+    def _launch_admitted(self, runner: Runner, base_image: str) -> Runner:
+        """Provision a runner holding quota, failing it if the launch errors."""
+        try:
+            return self._provision(runner, base_image)
+        except Exception:
+            self._fail_launch(runner)
+            raise
+
+    def _fail_launch(self, runner: Runner) -> None:
+        """
+        Mark an admitted runner whose launch errored FAILED, so its quota is
+        released instead of held by a STARTING runner that never starts.
+        """
+        runner.state = RunnerState.FAILED
+        try:
+            self.save_terminal(runner, drain=False)
+        except Exception:
+            logger.exception("Failed to release quota of runner %s", runner.id)
+
+    def save_terminal(self, runner: Runner, at: Optional[int] = None, drain: bool = True) -> None:
+        """
+        Persist a runner that went OFFLINE/FAILED at ``at`` (default: now),
+        unless its job already reported completion. Its quota is released in
+        the same transaction, so if that fails the runner stays live and is
+        retried by the janitor instead of keeping its quota forever. Unless
+        ``drain`` is False, a few pending runners are launched inline; the
+        janitor drains the rest.
+        """
+        if runner.completed_at is None:
+            runner.completed_at = at or int(time.time())
+        if not self.scheduler or not self.scheduler.release(runner):
+            self.runner_store.save(runner)
+            return
+        if not drain:
+            return
+        try:
+            self.drain_pending(limit=self.settings.inline_drain_limit)
+        except Exception:
+            logger.exception("Failed to drain pending runners after releasing %s", runner.id)
+
+    def resume_runner(self, runner_id: str) -> Runner:
+        """Retry provisioning a runner whose launch was deferred by backpressure."""
+        runner = self.runner_store.get_runner(runner_id)
+
+        if runner is None:
+            raise RuntimeError(f"Runner {runner_id} not found")
+
+        if runner.state != RunnerState.DEFERRED:
+            raise RuntimeError(f"Runner {runner_id} state is {runner.state}")
+
+        base_image = img_utils.base_image_from_labels(runner.labels) or runner.image
+        return self._provision(runner, base_image)
+
+    def resume_runners(self, runner_ids: List[str]) -> int:
+        """Resume a batch of deferred runners. Returns how many left DEFERRED."""
+        resumed = 0
+        for runner_id in runner_ids:
+            try:
+                if self.resume_runner(runner_id).state != RunnerState.DEFERRED:
+                    resumed += 1
+            except Exception:
+                logger.exception("Failed to resume runner %s", runner_id)
+        return resumed
+
+    def _provision(self, runner: Runner, base_image: str) -> Runner:
+        """
+        Build the image or launch the task for a runner record. If the AWS
+        backpressure layer refuses the calls, or AWS still throttles them
+        after retries, park the runner as DEFERRED so the janitor can retry
+        it once ECS recovers.
+        """
+        tag = runner.image
+        try:
+            image_uri = self._resolve_image_uri(tag)
+            if image_uri is None:
+                logger.info("Image %s not found in ECR, queuing build", tag)
+                runner.state = RunnerState.IMAGE_CREATING
+                self.runner_store.save(runner)
+                self._build_image_async(base_image, tag, runner.id)
+                return runner
+
+            logger.info("Found image %s, launching runner task", image_uri)
+            task_id = self._launch_runner_task(
+                image_uri, runner.id, runner.labels, tag, runner.runner_class, repo=runner.repo
+            )
+        except Exception as exc:
+            if not is_deferrable(exc):
+                raise
+            return self._defer(runner, exc)
 
-        logger.info("Found image %s, launching runner task", image_uri)
-        task_id = self._launch_runner_task(image_uri, labels, tag, class_name)
         runner.state = RunnerState.WAITING_FOR_JOB
         runner.task_id = task_id
+        runner.started_at = int(time.time())
+        self.runner_store.save(runner)
+        return runner
+
+    def _defer(self, runner: Runner, exc: Exception) -> Runner:
+        logger.warning("Deferring launch of runner %s: %s", runner.id, exc)
+        runner.state = RunnerState.DEFERRED
         self.runner_store.save(runner)
         return runner
 
@@ -69,51 +210,143 @@ class RunnerController:
     ):
         runner = self.runner_store.get_runner(runner_id)
         runner.state = RunnerState.FAILED
-        self.runner_store.save(runner)
+        self.save_terminal(runner)
 
-    def start_runner(self, runner_id: str) -> Runner:
+    def _built_runner(self, runner_id: str) -> Runner:
+        """The runner waiting for an image build that just finished."""
         runner = self.runner_store.get_runner(runner_id)
 
         if runner is None:
             raise RuntimeError(f"Runner {runner_id} not found")
 
-        if runner.state != RunnerState.IMAGE_CREATING:
+        if runner.state not in (RunnerState.OFFLINE, RunnerState.IMAGE_CREATING):
             raise RuntimeError(f"Runner {runner_id} state is {runner.state}")
+        return runner
+
+    def start_runner(self, runner_id: str) -> Runner:
+        runner = self._built_runner(runner_id)
+        if runner.state == RunnerState.OFFLINE:
+            logger.info("Runner %s was reclaimed while its image was building", runner_id)
+            return runner
 
         tag = img_utils.sanitize_image_label(runner.image)
         image_uri = self._resolve_image_uri(tag)
         if image_uri is None:
             raise RuntimeError(f"Image for tag {tag} not found in ECR")
 
-        task_id = self._launch_runner_task(image_uri, runner.labels, tag, runner.runner_class)
+        try:
+            task_id = self._launch_runner_task(
+                image_uri, runner.id, runner.labels, tag, runner.runner_class, repo=runner.repo
+            )
+        except Exception as exc:
+            if not is_deferrable(exc):
+                raise
+            return self._defer(runner, exc)
         runner.state = RunnerState.WAITING_FOR_JOB
         runner.task_id = task_id
+        runner.started_at = int(time.time())
         self.runner_store.save(runner)
         return runner
 
     def _resolve_image_uri(self, tag: str) -> Optional[str]:
         """Return the full ECR URI if the tag exists, else None."""
+        if tag in _image_uris:
+            return _image_uris[tag]
         try:
             self.ecr.describe_images(
                 repositoryName=self._repo_name,
                 imageIds=[{"imageTag": tag}],
             )
-            return f"{self.settings.runner_repository_url}:{tag}"
+            _image_uris[tag] = f"{self.settings.runner_repository_url}:{tag}"
+            return _image_uris[tag]
         except self.ecr.exceptions.ImageNotFoundException:
             return None
         except ClientError as e:
             logger.error("ECR lookup failed: %s", e)
             raise
 
-    def update_runner_state(self, runner_id: str, state: RunnerState) -> Runner:
+    def update_runner_state(self, runner_id: str, state: RunnerState, at: Optional[int] = None) -> Runner:
+        """Move a runner to ``state``; ``at`` is when it happened (default: now)."""
         runner = self.runner_store.get_runner(runner_id)
         if runner is None:
             raise RuntimeError(f"Runner {runner_id} not found")
         runner.state = state
-        self.runner_store.save(runner)
+        if state == RunnerState.RUNNING and runner.job_started_at is None:
+            runner.job_started_at = at or int(time.time())
+        if state in TERMINAL_STATES:
+            self.save_terminal(runner, at)
+        else:
+            self.runner_store.save(runner)
         return runner
 
-    def terminate_runner(self, runner_id: str) -> Optional[Runner]:
+    def job_started(self, job_id: str, runner_name: Optional[str]) -> Optional[Runner]:
+        """
+        Correlate a job that went ``in_progress`` on ``runner_name`` with the
+        runner launched for it. If a different runner picked the job up, the
+        idle runner reserved for it takes over the picker's former job when
+        the labels are compatible, and is stopped otherwise.
+        Returns the reclaimed runner, if any.
+        """
+        reserved = self._reserved_runner(job_id)
+        picker = self.runner_store.get_runner(runner_name) if runner_name else None
+
+        freed_job = None
+        if picker is not None:
+            if picker.job_status == "queued" and picker.job_id and picker.job_id != job_id:
+                # The picker was launched for another job that is still queued
+                freed_job = (picker.job_id, picker.workflow_id)
+            picker.job_id = job_id
+            picker.job_status = "in_progress"
+            self.runner_store.save(picker)
+
+        if reserved is None or (picker is not None and reserved.id == picker.id):
+            return None
+
+        if freed_job and self._labels_compatible(picker.labels, reserved.labels):
+            logger.info("Reassigning runner %s from job %s to job %s", reserved.id, job_id, freed_job[0])
+            reserved.job_id, reserved.workflow_id = freed_job
+            reserved.job_status = "queued"
+            self.runner_store.save(reserved)
+            return None
+
+        return self._reclaim(reserved, f"Job {job_id} picked up by {runner_name}")
+
+    def job_finished(self, job_id: str, runner_name: Optional[str], conclusion: Optional[str]) -> Optional[Runner]:
+        """
+        Record a ``completed`` job. A runner still idle for it (job cancelled
+        while queued, or run elsewhere) is stopped.
+        Returns the reclaimed runner, if any.
+        """
+        reserved = self._reserved_runner(job_id)
+        if reserved is not None and reserved.id != runner_name:
+            return self._reclaim(reserved, f"Job {job_id} {conclusion or 'completed'} before pickup")
+
+        for runner in self.runner_store.find_by_job(job_id):
+            runner.job_status = conclusion or "completed"
+            self.runner_store.save(runner)
+        return None
+
+    def _reserved_runner(self, job_id: str) -> Optional[Runner]:
+        """Return the idle runner launched for (or reassigned to) a job."""
+        for runner in self.runner_store.find_by_job(job_id):
+            if runner.state in IDLE_STATES and runner.job_status == "queued":
+                return runner
+        return None
+
+    @staticmethod
+    def _labels_compatible(job_labels: str, runner_labels: str) -> bool:
+        """A runner can take a job if it carries every label the job asks for."""
+        return set(job_labels.split(",")) <= set(runner_labels.split(","))
+
+    def _reclaim(self, runner: Runner, reason: str) -> Optional[Runner]:
+        logger.info("Reclaiming surplus runner %s: %s", runner.id, reason)
+        runner.job_status = "reclaimed"
+        self.runner_store.save(runner)
+        return self.terminate_runner(runner.id, reason=reason)
+
+    def terminate_runner(
+            self, runner_id: str, reason: str = "Runner job completed", at: Optional[int] = None
+    ) -> Optional[Runner]:
         runner = self.runner_store.get_runner(runner_id)
         if runner is None:
             logger.warning("Runner %s not found when terminating", runner_id)
@@ -125,10 +358,10 @@ class RunnerController:
                 self.ecs.stop_task(
                     cluster=self.settings.cluster,
                     task=task_id,
-                    reason="Runner job completed",
+                    reason=reason,
                 )
             runner.state = RunnerState.OFFLINE
-            self.runner_store.save(runner)
+            self.save_terminal(runner, at)
             return runner
         except Exception as exc:  # pragma: no cover - logging only
             logger.exception(
@@ -158,26 +391,55 @@ class RunnerController:
     def _launch_runner_task(
             self,
             image_uri: str,
+            runner_id: str,
             labels: str,
             tag: str,
             class_name: Optional[str] = None,
+            repo: Optional[str] = None,
     ) -> str:
         """
         Run a Fargate task for the runner.
+        The runner is registered up front with a just-in-time config named
+        after the runner id, so the container skips ``config.sh``. If the
+        task does not start, the registration is deleted again so a later
+        retry can register the same name.
         Applies class-based CPU/memory overrides if available.
         """
         logger.info(f"Launching runner task for {image_uri}, {labels}, {tag}, {class_name}")
-        token = gh_utils.get_runner_token(self.settings)
-        task_def = self._get_or_register_task_definition(image_uri, tag)
+        repo = repo or self.settings.github_repo
+        gh_runner_id, jit_config = gh_utils.create_jit_runner(self.settings, runner_id, labels.split(","), repo)
+        try:
+            task_def = self._get_or_register_task_definition(image_uri, tag)
+            return self._run_task(task_def, jit_config, runner_id, class_name, repo)
+        except BaseException:
+            self._discard_jit_runner(gh_runner_id, repo)
+            raise
 
+    def _discard_jit_runner(self, gh_runner_id: int, repo: str) -> None:
+        """Delete a JIT registration whose runner will not start."""
+        try:
+            gh_utils.delete_runner(self.settings, gh_runner_id, repo)
+        except Exception:
+            logger.exception("Failed to discard JIT runner registration %s", gh_runner_id)
+
+    def _run_task(
+            self,
+            task_def: str,
+            jit_config: str,
+            runner_id: str,
+            class_name: Optional[str],
+            repo: str,
+    ) -> str:
+        """RunTask for a registered runner; returns the ECS task id."""
         logger.info(f"Task definition: {task_def}")
 
         container_env = [
-            {"name": "RUNNER_REPOSITORY_URL", "value": f"https://github.com/{self.settings.github_repo}"},
-            {"name": "RUNNER_TOKEN", "value": token},
-            {"name": "RUNNER_LABELS", "value": labels},
-            {"name": "RUNNER_NAME", "value": "runner"},
+            {"name": "RUNNER_JIT_CONFIG", "value": jit_config},
+            {"name": "RUNNER_NAME", "value": runner_id},
+            {"name": "RUNNER_ID", "value": runner_id},
+            {"name": "GITHUB_REPO", "value": repo},
             {"name": "RUNNER_TABLE", "value": self.settings.runner_table},
+            {"name": "HEARTBEAT_INTERVAL", "value": str(self.settings.heartbeat_interval_seconds)},
         ]
         overrides: Dict[str, Any] = {"containerOverrides": [{"name": "runner", "environment": container_env}]}
 
@@ -216,16 +478,35 @@ class RunnerController:
         return task_id
 
     def _get_or_register_task_definition(self, image_uri: str, label: str) -> str:
-        """Describe existing task def by family, or register a new one."""
+        """
+        Describe existing task def by family, or register a new one.
+        Families are per image and shared by all repos; the repo is passed
+        in the container overrides.
+        """
+        family = self._task_family(label)
+        return self._lookup_task_definition(family) or self._register_task_definition(family, image_uri)
+
+    @staticmethod
+    def _task_family(label: str) -> str:
         family = "github-runner"
         if label:
             family = f"{family}-{img_utils.sanitize_image_label(label)}"
+        return family
+
+    def _lookup_task_definition(self, family: str) -> Optional[str]:
+        """Return the latest task definition ARN of ``family``, if registered."""
+        if family in _task_definitions:
+            return _task_definitions[family]
         try:
             resp = self.ecs.describe_task_definition(taskDefinition=family)
-            return resp["taskDefinition"]["taskDefinitionArn"]
         except ClientError as exc:
             if exc.response.get("Error", {}).get("Code") != "ClientException":
                 raise
+            return None
+        _task_definitions[family] = resp["taskDefinition"]["taskDefinitionArn"]
+        return _task_definitions[family]
+
+    def _register_task_definition(self, family: str, image_uri: str) -> str:
         container = {
             "name": "runner",
             "image": image_uri,
@@ -233,7 +514,6 @@ class RunnerController:
             "memory": 2048,
             "essential": True,
             "environment": [
-                {"name": "GITHUB_REPO", "value": self.settings.github_repo},
                 {"name": "EVENT_BUS_NAME", "value": self.settings.event_bus_name or ""},
             ],
             "logConfiguration": {
@@ -255,4 +535,5 @@ class RunnerController:
             memory="2048",
             containerDefinitions=[container],
         )
-        return resp["taskDefinition"]["taskDefinitionArn"]
+        _task_definitions[family] = resp["taskDefinition"]["taskDefinitionArn"]
+        return _task_definitions[family]
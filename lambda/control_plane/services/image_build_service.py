@@ -5,7 +5,7 @@ from typing import Any, Dict
 from aws_lambda_powertools import Logger, Tracer
 
 from config import Settings, resource
-from runner_controller import RunnerController
+from async_controller import get_controller
 
 
 class ImageBuildService:
@@ -15,7 +15,7 @@ class ImageBuildService:
         self.settings = settings
         self.logger = logger
         self.tracer = tracer
-        self.runner_controller = RunnerController(settings)
+        self.runner_controller = get_controller(settings)
 
     def handle_event(self, detail: Dict[str, Any]) -> Dict[str, Any]:
         build_id = detail.get("build_id")
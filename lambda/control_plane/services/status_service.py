@@ -8,7 +8,7 @@ from aws_lambda_powertools import Logger, Tracer
 
 from config import Settings, client, resource
 from models import Runner, RunnerState
-from runner_controller import RunnerController
+from async_controller import get_controller
 
 
 class StatusService:
@@ -18,7 +18,7 @@ class StatusService:
         self.settings = settings
         self.logger = logger
         self.tracer = tracer
-        self.runner_controller = RunnerController(settings)
+        self.runner_controller = get_controller(settings)
 
     def handle_event(self, detail: Dict[str, Any]) -> None:
         if isinstance(detail, str):
@@ -28,8 +28,14 @@ class StatusService:
                 detail = {}
         status = detail.get("status")
         runner_id = detail.get("runner_id")
+        # Stamped by the runner when the event was sent
+        timestamp = int(detail.get("timestamp") or time.time())
 
         if status == "RUNNING":
-            self.runner_controller.update_runner_state(runner_id, RunnerState.RUNNING)
+            self.runner_controller.update_runner_state(runner_id, RunnerState.RUNNING, at=timestamp)
+        elif status == "COMPLETED":
+            self.runner_controller.runner_store.complete_job(runner_id, timestamp)
         elif status == "OFFLINE":
-            self.runner_controller.terminate_runner(runner_id)
+            self.runner_controller.terminate_runner(runner_id, at=timestamp)
+        elif status == "HEARTBEAT":
+            self.runner_controller.runner_store.heartbeat(runner_id, timestamp)
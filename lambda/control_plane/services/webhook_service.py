@@ -2,24 +2,28 @@ from __future__ import annotations
 
 import base64
 import json
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from aws_lambda_powertools import Logger, Tracer
 
 from config import Settings
 from models import RunnerState
-from runner_controller import RunnerController
+from async_controller import get_controller
+from store.delivery_store import DeliveryStore
 from utilities.github import verify_github_signature
 
 
 class WebhookService:
+    HANDLED_ACTIONS = frozenset({"queued", "in_progress", "completed"})
+
     def __init__(
             self, settings: Settings, logger: Logger, tracer: Tracer
     ) -> None:
         self.settings = settings
         self.logger = logger
         self.tracer = tracer
-        self.runner_controller = RunnerController(settings)
+        self.runner_controller = get_controller(settings)
+        self.delivery_store = DeliveryStore(settings) if settings.dedupe_table else None
 
     def handle_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
         body = event.get("body")
@@ -46,9 +50,40 @@ class WebhookService:
         except json.JSONDecodeError:
             return {"statusCode": 400, "body": "invalid json"}
         action = payload.get("action")
-        if action != "queued" or "workflow_job" not in payload:
+        if action not in self.HANDLED_ACTIONS or "workflow_job" not in payload:
             return {"statusCode": 200, "body": "ignored"}
         job = payload.get("workflow_job", {})
+        repo = (payload.get("repository") or {}).get("full_name") or self.settings.github_repo
+        if not self.settings.serves_repo(repo):
+            return {"statusCode": 403, "body": "repository not served"}
+
+        if action == "queued":
+            return self._handle_queued(headers, job, repo)
+
+        job_id = str(job.get("id", ""))
+        if not job_id:
+            return {"statusCode": 400, "body": "missing job id"}
+
+        dedupe_keys = self._dedupe_keys(headers, action, job)
+        if not self._claim(dedupe_keys):
+            return {"statusCode": 200, "body": "duplicate"}
+        try:
+            if action == "in_progress":
+                reclaimed = self.runner_controller.job_started(job_id, job.get("runner_name"))
+            else:
+                reclaimed = self.runner_controller.job_finished(
+                    job_id, job.get("runner_name"), job.get("conclusion")
+                )
+        except Exception:
+            if self.delivery_store:
+                self.delivery_store.release(dedupe_keys)
+            raise
+
+        if reclaimed is not None:
+            return {"statusCode": 200, "body": "runner reclaimed"}
+        return {"statusCode": 200, "body": "job updated"}
+
+    def _handle_queued(self, headers: Dict[str, Any], job: Dict[str, Any], repo: str) -> Dict[str, Any]:
         job_labels = job.get("labels", [])
         if not job_labels:
             return {"statusCode": 400, "body": "missing labels"}
@@ -65,11 +100,62 @@ class WebhookService:
         if base_image is None:
             return {"statusCode": 400, "body": "no base image"}
 
-        runner = self.runner_controller.new_runner(runner_labels, base_image, class_name)
+        dedupe_keys = self._dedupe_keys(headers, "queued", job)
+        if not self._claim(dedupe_keys):
+            return {"statusCode": 200, "body": "duplicate"}
+
+        job_id = job.get("id")
+        workflow_id = job.get("run_id")
+        try:
+            runner = self.runner_controller.new_runner(
+                runner_labels,
+                base_image,
+                class_name,
+                job_id=str(job_id) if job_id is not None else None,
+                workflow_id=str(workflow_id) if workflow_id is not None else None,
+                repo=repo,
+            )
+        except Exception:
+            # Let GitHub's redelivery retry a launch that never happened
+            if self.delivery_store:
+                self.delivery_store.release(dedupe_keys)
+            raise
 
         if runner.state == RunnerState.IMAGE_CREATING:
             return {"statusCode": 202, "body": "image build"}
         elif runner.state == RunnerState.WAITING_FOR_JOB:
             return {"statusCode": 200, "body": "task started"}
+        elif runner.state == RunnerState.DEFERRED:
+            return {"statusCode": 202, "body": "launch deferred"}
+        elif runner.state == RunnerState.PENDING:
+            return {"statusCode": 202, "body": "queued for quota"}
         else:
             return {"statusCode": 500, "body": "unknown state"}
+
+    @staticmethod
+    def _dedupe_keys(headers: Dict[str, Any], action: str, job: Dict[str, Any]) -> List[str]:
+        keys = []
+        delivery_id = headers.get("x-github-delivery") or headers.get("X-GitHub-Delivery")
+        if delivery_id:
+            keys.append(f"delivery:{delivery_id}")
+        if job.get("id") is not None:
+            keys.append(f"job:{job['id']}:{action}")
+        return keys
+
+    def _claim(self, keys: List[str]) -> bool:
+        if not self.delivery_store or not keys:
+            return True
+        claimed = self.delivery_store.claim(keys)
+        store = self.delivery_store
+        self.logger.info(
+            "Webhook dedupe",
+            extra={
+                "dedupe_keys": keys,
+                "duplicate": not claimed,
+                "dedupe_lookups": store.lookups,
+                "dedupe_local_hits": store.local_hits,
+                "dedupe_remote_hits": store.remote_hits,
+                "dedupe_hit_rate": round(store.hit_rate, 4),
+            },
+        )
+        return claimed
@@ -0,0 +1,97 @@
+import io
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from ulid import ULID
+
+from config import Settings
+from models import Runner
+from utilities.object_store import ObjectStore, open_object_store
+
+# Objects live under <archive_url>/runners/date=YYYY-MM-DD/class=<class>/
+ARCHIVE_PREFIX = "runners"
+
+# Hive convention for a missing partition value, read back as null
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+SCHEMA = pa.schema([
+    ("runner_id", pa.string()),
+    ("status", pa.string()),
+    ("repo", pa.string()),
+    ("runner_class", pa.string()),
+    ("labels", pa.string()),
+    ("image", pa.string()),
+    ("created_at", pa.int64()),
+    ("started_at", pa.int64()),
+    ("job_started_at", pa.int64()),
+    ("completed_at", pa.int64()),
+    ("last_heartbeat", pa.int64()),
+    ("job_id", pa.string()),
+    ("workflow_id", pa.string()),
+    ("job_status", pa.string()),
+    ("task_id", pa.string()),
+])
+
+
+def _int(value) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def to_row(runner: Runner) -> Dict:
+    return {
+        "runner_id": runner.id,
+        "status": getattr(runner.state, "value", runner.state),
+        "repo": runner.repo,
+        "runner_class": runner.runner_class,
+        "labels": runner.labels or None,
+        "image": runner.image,
+        "created_at": _int(runner.created_at),
+        "started_at": _int(runner.started_at),
+        "job_started_at": _int(runner.job_started_at),
+        "completed_at": _int(runner.completed_at),
+        "last_heartbeat": _int(runner.last_heartbeat),
+        "job_id": runner.job_id,
+        "workflow_id": runner.workflow_id,
+        "job_status": runner.job_status,
+        "task_id": runner.task_id,
+    }
+
+
+def partition_of(runner: Runner) -> Tuple[str, str]:
+    """(date, class) partition of a runner, dated by completion if known."""
+    ts = int(runner.completed_at or runner.created_at)
+    date = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+    return date, runner.runner_class or NULL_PARTITION
+
+
+class ArchiveStore:
+    """
+    Writes runner records as zstd-compressed Parquet files, partitioned
+    Hive-style by date and class so readers can prune whole directories
+    and, within a file, read only the columns they need.
+    """
+
+    def __init__(self,
+                 settings: Settings,
+                 object_store: ObjectStore = None):
+        self.settings = settings
+        self.object_store = object_store or open_object_store(settings.archive_url)
+
+    def write(self, runners: List[Runner]) -> List[str]:
+        """Write one file per partition and return their URIs."""
+        partitions: Dict[Tuple[str, str], List[Runner]] = defaultdict(list)
+        for runner in runners:
+            partitions[partition_of(runner)].append(runner)
+
+        uris = []
+        for (date, runner_class), members in sorted(partitions.items()):
+            members.sort(key=lambda r: int(r.created_at))
+            table = pa.Table.from_pylist([to_row(r) for r in members], schema=SCHEMA)
+            buf = io.BytesIO()
+            pq.write_table(table, buf, compression="zstd")
+            key = f"{ARCHIVE_PREFIX}/date={date}/class={runner_class}/part-{ULID()}.parquet"
+            uris.append(self.object_store.put(key, buf.getvalue()))
+        return uris
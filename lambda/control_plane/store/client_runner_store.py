@@ -0,0 +1,107 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from config import Settings, client
+from models import Runner, TERMINAL_STATES
+from store.codec import encode_item, runner_from_attribute_values
+from store.runner_store import ACTIVE_INDEX, JOB_INDEX, PENDING_INDEX, RunnerStore
+
+
+class ClientRunnerStore(RunnerStore):
+    """
+    RunnerStore whose reads go through the low-level DynamoDB client and
+    :mod:`store.codec` instead of the resource layer. Reads can be limited
+    to the attributes a caller needs with ``projection``; attributes left
+    out keep their :class:`Runner` defaults, so projected runners must not
+    be written back with :meth:`save`. Unlike the resource ``Table``, the
+    client is thread-safe, so one store can serve concurrent launches.
+    """
+
+    def __init__(self,
+                 settings: Settings):
+        super().__init__(settings)
+        self.client = client("dynamodb")
+
+    @staticmethod
+    def _projection(attributes: Optional[Sequence[str]]) -> Dict[str, Any]:
+        if not attributes:
+            return {}
+        # Placeholders throughout: status and timestamp are reserved words
+        names = {f"#p{i}": attr for i, attr in enumerate({"runner_id", *attributes})}
+        return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+    def _paginate(self, op, kwargs: Dict[str, Any]) -> Iterator[Runner]:
+        while True:
+            resp = op(**kwargs)
+            for item in resp.get("Items", []):
+                yield runner_from_attribute_values(item)
+            if not resp.get("LastEvaluatedKey"):
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def get_runner(self, runner_id: str, projection: Optional[Sequence[str]] = None) -> Optional[Runner]:
+        resp = self.client.get_item(
+            TableName=self.settings.runner_table,
+            Key={"runner_id": {"S": runner_id}},
+            **self._projection(projection),
+        )
+        item = resp.get("Item")
+        if not item:
+            return None
+        return runner_from_attribute_values(item)
+
+    def find_by_job(self, job_id: str) -> List[Runner]:
+        return list(self._paginate(self.client.query, {
+            "TableName": self.settings.runner_table,
+            "IndexName": JOB_INDEX,
+            "KeyConditionExpression": "job_id = :job",
+            "ExpressionAttributeValues": {":job": {"S": job_id}},
+        }))
+
+    def list_active(self, repo: Optional[str] = None, projection: Optional[Sequence[str]] = None) -> Iterator[Runner]:
+        return self._read_index(ACTIVE_INDEX, "active_repo", repo, projection)
+
+    def list_pending(self, repo: Optional[str] = None) -> List[Runner]:
+        return list(self._read_index(PENDING_INDEX, "pending_repo", repo))
+
+    def _read_index(
+            self, index: str, key: str, repo: Optional[str], projection: Optional[Sequence[str]] = None
+    ) -> Iterator[Runner]:
+        kwargs: Dict[str, Any] = {"TableName": self.settings.runner_table, "IndexName": index}
+        kwargs.update(self._projection(projection))
+        if not repo:
+            return self._paginate(self.client.scan, kwargs)
+        kwargs["KeyConditionExpression"] = "#k = :repo"
+        kwargs.setdefault("ExpressionAttributeNames", {})["#k"] = key
+        kwargs["ExpressionAttributeValues"] = {":repo": {"S": repo}}
+        return self._paginate(self.client.query, kwargs)
+
+    def scan(self, projection: Optional[Sequence[str]] = None) -> Iterator[Runner]:
+        """Yield every runner in the table, e.g. to rebuild derived data."""
+        kwargs: Dict[str, Any] = {"TableName": self.settings.runner_table}
+        kwargs.update(self._projection(projection))
+        return self._paginate(self.client.scan, kwargs)
+
+    def save(self, runner: Runner) -> Runner:
+        self.client.put_item(TableName=self.settings.runner_table, Item=encode_item(runner.to_item()))
+        return runner
+
+    def list_archivable(self, cutoff: int) -> Iterator[Runner]:
+        states = sorted(state.value for state in TERMINAL_STATES)
+        values = {f":s{i}": {"S": state} for i, state in enumerate(states)}
+        values[":cutoff"] = {"N": str(cutoff)}
+        return self._paginate(self.client.scan, {
+            "TableName": self.settings.runner_table,
+            "FilterExpression": (
+                f"#st IN ({', '.join(v for v in values if v.startswith(':s'))}) "
+                "AND #ts < :cutoff AND attribute_not_exists(expires_at)"
+            ),
+            "ExpressionAttributeNames": {"#st": "status", "#ts": "timestamp"},
+            "ExpressionAttributeValues": values,
+        })
+
+
+def get_runner_store(settings: Settings) -> RunnerStore:
+    """The runner store for the configured ``runner_store_backend``."""
+    if settings.runner_store_backend == "client":
+        return ClientRunnerStore(settings)
+    return RunnerStore(settings)
@@ -0,0 +1,123 @@
+"""
+Hand-written DynamoDB attribute value codec.
+
+The boto3 resource layer runs every attribute through ``TypeDeserializer``,
+which dispatches per type via ``getattr`` and turns every number into a
+``Decimal``. Runner items are flat strings and integer timestamps, so the
+decoder here special-cases those and builds :class:`Runner` objects straight
+from the wire format, without an intermediate dict.
+"""
+import time
+from decimal import Decimal
+from typing import Any, Dict
+
+from models import Runner, RunnerState
+
+_STATES = {state.value: state for state in RunnerState}
+
+
+def _number(text: str):
+    # Integral values (timestamps, counters) are by far the most common
+    try:
+        return int(text)
+    except ValueError:
+        return Decimal(text)
+
+
+def decode_value(av: Dict[str, Any]) -> Any:
+    for tag, value in av.items():
+        if tag == "S":
+            return value
+        if tag == "N":
+            return _number(value)
+        if tag == "BOOL":
+            return value
+        if tag == "NULL":
+            return None
+        if tag == "M":
+            return {k: decode_value(v) for k, v in value.items()}
+        if tag == "L":
+            return [decode_value(v) for v in value]
+        if tag == "SS":
+            return set(value)
+        if tag == "NS":
+            return {_number(v) for v in value}
+        if tag == "B":
+            return bytes(value)
+        if tag == "BS":
+            return {bytes(v) for v in value}
+        raise TypeError(f"Unsupported attribute value type {tag!r}")
+    raise TypeError("Empty attribute value")
+
+
+def decode_item(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: decode_value(v) for k, v in item.items()}
+
+
+def encode_value(value: Any) -> Dict[str, Any]:
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, str):
+        return {"S": value}
+    # bool before int: bool is an int subclass
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, (int, Decimal)):
+        return {"N": str(value)}
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, (bytes, bytearray)):
+        return {"B": bytes(value)}
+    if isinstance(value, dict):
+        return {"M": {k: encode_value(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {"L": [encode_value(v) for v in value]}
+    if isinstance(value, (set, frozenset)) and value:
+        sample = next(iter(value))
+        if isinstance(sample, str):
+            return {"SS": list(value)}
+        if isinstance(sample, (bytes, bytearray)):
+            return {"BS": [bytes(v) for v in value]}
+        return {"NS": [str(v) for v in value]}
+    raise TypeError(f"Unsupported type {type(value).__name__}")
+
+
+def encode_item(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {k: encode_value(v) for k, v in item.items()}
+
+
+def _get(item: Dict[str, Dict[str, Any]], name: str) -> Any:
+    av = item.get(name)
+    if av is None:
+        return None
+    if "S" in av:
+        return av["S"]
+    if "N" in av:
+        return _number(av["N"])
+    return decode_value(av)
+
+
+def runner_from_attribute_values(item: Dict[str, Dict[str, Any]]) -> Runner:
+    """Equivalent of ``Runner.from_item(TypeDeserializer()(item))``, minus the overhead."""
+    status = _get(item, "status")
+    created_at = _get(item, "timestamp")
+    quota = item.get("quota_vcpus")
+    return Runner(
+        id=_get(item, "runner_id"),
+        state=_STATES.get(status, RunnerState.OFFLINE),
+        labels=_get(item, "runner_labels") or "",
+        image=_get(item, "image_tag"),
+        created_at=created_at if created_at is not None else int(time.time()),
+        started_at=_get(item, "started_at"),
+        job_started_at=_get(item, "job_started_at"),
+        completed_at=_get(item, "completed_at"),
+        runner_class=_get(item, "class_name"),
+        workflow_id=_get(item, "workflow_job_id"),
+        job_id=_get(item, "job_id"),
+        job_status=_get(item, "job_status"),
+        task_id=_get(item, "task_id"),
+        last_heartbeat=_get(item, "last_heartbeat"),
+        repo=_get(item, "repo"),
+        quota_vcpus=Decimal(quota["N"]) if quota else None,
+        expires_at=_get(item, "expires_at"),
+    )
@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List
+
+from botocore.exceptions import ClientError
+
+from config import Settings, resource
+
+
+class DeliveryStore:
+    """
+    Records processed webhook deliveries so GitHub redeliveries are ignored.
+
+    Keys are claimed together in one transaction of conditional puts
+    carrying a DynamoDB TTL. A small in-process LRU of recently seen keys
+    answers hot repeats without a DynamoDB round trip.
+    """
+
+    def __init__(self,
+                 settings: Settings,
+                 cache_size: int = 1024):
+        self.settings = settings
+        dynamodb = resource("dynamodb")
+        self.table = dynamodb.Table(settings.dedupe_table)
+        # The resource's client accepts native Python values for transactions
+        self.client = dynamodb.meta.client
+        self.ttl_seconds = settings.dedupe_ttl_seconds
+        self.cache_size = cache_size
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.lookups = 0
+        self.local_hits = 0
+        self.remote_hits = 0
+
+    @property
+    def hit_rate(self) -> float:
+        if not self.lookups:
+            return 0.0
+        return (self.local_hits + self.remote_hits) / self.lookups
+
+    def claim(self, keys: Iterable[str]) -> bool:
+        """
+        Claim every key. Return False if any of them was already claimed,
+        i.e. the delivery is a duplicate.
+        """
+        keys = [k for k in keys if k]
+        self.lookups += 1
+        if any(k in self._seen for k in keys):
+            self.local_hits += 1
+            for k in keys:
+                self._remember(k)
+            return False
+
+        expires_at = int(time.time()) + self.ttl_seconds
+        # All keys in one transaction: a failure part-way must not leave a
+        # key claimed for a delivery that was never processed
+        items: List[Dict[str, Any]] = [{
+            "Put": {
+                "TableName": self.settings.dedupe_table,
+                "Item": {"dedupe_key": key, "expires_at": expires_at},
+                "ConditionExpression": "attribute_not_exists(dedupe_key)",
+            }
+        } for key in keys]
+        try:
+            self.client.transact_write_items(TransactItems=items)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                raise
+            reasons = exc.response.get("CancellationReasons", [])
+            if not any(r.get("Code") == "ConditionalCheckFailed" for r in reasons):
+                raise
+            self.remote_hits += 1
+            for k in keys:
+                self._remember(k)
+            return False
+
+        for k in keys:
+            self._remember(k)
+        return True
+
+    def release(self, keys: Iterable[str]) -> None:
+        """Forget claimed keys so a redelivery is processed again."""
+        for key in keys:
+            if not key:
+                continue
+            self._seen.pop(key, None)
+            self.table.delete_item(Key={"dedupe_key": key})
+
+    def _remember(self, key: str) -> None:
+        self._seen[key] = None
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.cache_size:
+            self._seen.popitem(last=False)
@@ -0,0 +1,115 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from config import Settings, resource
+
+
+class QuotaStore:
+    """
+    Atomic per-scope usage counters (``runners`` and ``vcpus``) in DynamoDB.
+
+    A scope is a tenant key such as ``repo#owner/name`` or ``class#large``.
+    Admission bumps every scope of a runner and flags the runner record as
+    holding quota in one transaction, with each counter conditioned on its
+    limit, so concurrent Lambdas can never overshoot a quota. Release undoes
+    it exactly once, in the same transaction that writes the runner's
+    terminal record: the transaction is conditioned on the flag still being
+    present, so a runner is never terminal while still counted.
+    """
+
+    def __init__(self,
+                 settings: Settings):
+        self.settings = settings
+        dynamodb = resource("dynamodb")
+        self.table = dynamodb.Table(settings.quota_table)
+        # The resource's client accepts native Python values for transactions
+        self.client = dynamodb.meta.client
+
+    def acquire(self, runner_id: str, vcpus: Decimal, limits: Dict[str, Dict[str, Any]], status: str) -> bool:
+        """
+        Count a runner against every scope in ``limits`` (scope -> optional
+        ``max_runners``/``vcpus``). Return False if any limit would be
+        exceeded, or if the runner record is no longer in ``status`` (e.g. a
+        PENDING runner, read from the eventually consistent pending index,
+        that was reclaimed in the meantime).
+        """
+        items: List[Dict[str, Any]] = [{
+            "Update": {
+                "TableName": self.settings.runner_table,
+                "Key": {"runner_id": runner_id},
+                "UpdateExpression": "SET quota_vcpus = :cpu",
+                "ConditionExpression": "attribute_not_exists(quota_vcpus) AND #st = :status",
+                "ExpressionAttributeNames": {"#st": "status"},
+                "ExpressionAttributeValues": {":cpu": vcpus, ":status": status},
+            }
+        }]
+        for scope, limit in limits.items():
+            values: Dict[str, Any] = {":one": 1, ":cpu": vcpus}
+            conditions = []
+            if limit.get("max_runners") is not None:
+                conditions.append("(attribute_not_exists(runners) OR runners < :max)")
+                values[":max"] = int(limit["max_runners"])
+            if limit.get("vcpus") is not None:
+                room = Decimal(str(limit["vcpus"])) - vcpus
+                if room < 0:
+                    return False
+                conditions.append("(attribute_not_exists(vcpus) OR vcpus <= :room)")
+                values[":room"] = room
+            update: Dict[str, Any] = {
+                "TableName": self.settings.quota_table,
+                "Key": {"scope": scope},
+                "UpdateExpression": "ADD runners :one, vcpus :cpu",
+                "ExpressionAttributeValues": values,
+            }
+            if conditions:
+                update["ConditionExpression"] = " AND ".join(conditions)
+            items.append({"Update": update})
+        return self._transact(items)
+
+    def release(self, item: Dict[str, Any], vcpus: Decimal, scopes: List[str]) -> bool:
+        """
+        Undo :meth:`acquire` and put the runner record ``item`` (without
+        ``quota_vcpus``) in one transaction. Return False, writing nothing,
+        if the runner held no quota.
+        """
+        items: List[Dict[str, Any]] = [{
+            "Put": {
+                "TableName": self.settings.runner_table,
+                "Item": item,
+                "ConditionExpression": "attribute_exists(quota_vcpus)",
+            }
+        }]
+        for scope in scopes:
+            items.append({
+                "Update": {
+                    "TableName": self.settings.quota_table,
+                    "Key": {"scope": scope},
+                    "UpdateExpression": "ADD runners :one, vcpus :cpu",
+                    "ExpressionAttributeValues": {":one": -1, ":cpu": -vcpus},
+                }
+            })
+        return self._transact(items)
+
+    def usage(self, scope: str) -> Dict[str, Decimal]:
+        item: Optional[dict] = self.table.get_item(Key={"scope": scope}).get("Item")
+        item = item or {}
+        return {"runners": item.get("runners", Decimal(0)), "vcpus": item.get("vcpus", Decimal(0))}
+
+    def _transact(self, items: List[Dict[str, Any]]) -> bool:
+        """
+        Write ``items`` atomically. Return False if a condition failed; any
+        other cancellation (a conflicting transaction, throttling) is raised,
+        so it is never mistaken for "over quota" or "already released".
+        """
+        try:
+            self.client.transact_write_items(TransactItems=items)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                raise
+            reasons = exc.response.get("CancellationReasons", [])
+            if any(reason.get("Code") == "ConditionalCheckFailed" for reason in reasons):
+                return False
+            raise
+        return True
@@ -1,9 +1,17 @@
 import time
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
 from ulid import ULID
 
 from config import Settings, resource
-from models import Runner, RunnerState
+from models import Runner, RunnerState, TERMINAL_STATES
+from store.summary_store import SummaryStore
+
+
+JOB_INDEX = "job_id-index"
+ACTIVE_INDEX = "repo-active-index"
+PENDING_INDEX = "repo-pending-index"
 
 
 class RunnerStore:
@@ -12,8 +20,9 @@ class RunnerStore:
                  settings: Settings):
         self.settings = settings
         self.table = resource("dynamodb").Table(settings.runner_table)
+        self._summary: Optional[SummaryStore] = None
 
-    def new_runner(self, runner_labels, tag, class_name) -> Runner:
+    def new_runner(self, runner_labels, tag, class_name, job_id=None, workflow_id=None, repo=None) -> Runner:
         runner = Runner(
             id=str(ULID()),
             state=RunnerState.STARTING,
@@ -21,9 +30,12 @@ class RunnerStore:
             image=tag,
             created_at=int(time.time()),
             runner_class=class_name,
+            workflow_id=workflow_id,
+            job_id=job_id,
+            job_status="queued" if job_id else None,
+            repo=repo or self.settings.github_repo,
         )
-        self.table.put_item(Item=runner.to_item())
-        return runner
+        return self.save(runner)
 
     def get_runner(self, runner_id: str) -> Optional[Runner]:
         resp = self.table.get_item(Key={"runner_id": runner_id})
@@ -32,6 +44,135 @@ class RunnerStore:
             return None
         return Runner.from_item(item)
 
+    def find_by_job(self, job_id: str) -> List[Runner]:
+        """Return the runners correlated with a workflow job."""
+        resp = self.table.query(
+            IndexName=JOB_INDEX,
+            KeyConditionExpression=Key("job_id").eq(job_id),
+        )
+        return [Runner.from_item(item) for item in resp.get("Items", [])]
+
+    def list_active(self, repo: Optional[str] = None) -> Iterator[Runner]:
+        """
+        Yield non-terminal runners from the sparse ``repo-active-index``:
+        a Query for one repo, or a Scan of the index (never the base table)
+        across all repos.
+        """
+        return self._read_index(ACTIVE_INDEX, "active_repo", repo)
+
+    def list_pending(self, repo: Optional[str] = None) -> List[Runner]:
+        """Return runners waiting for quota, from the sparse ``repo-pending-index``."""
+        return list(self._read_index(PENDING_INDEX, "pending_repo", repo))
+
+    def _read_index(self, index: str, key: str, repo: Optional[str]) -> Iterator[Runner]:
+        kwargs: Dict[str, Any] = {"IndexName": index}
+        if repo:
+            kwargs["KeyConditionExpression"] = Key(key).eq(repo)
+            op = self.table.query
+        else:
+            op = self.table.scan
+        while True:
+            resp = op(**kwargs)
+            for item in resp.get("Items", []):
+                yield Runner.from_item(item)
+            if not resp.get("LastEvaluatedKey"):
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def list_archivable(self, cutoff: int) -> Iterator[Runner]:
+        """
+        Yield OFFLINE/FAILED runners created before ``cutoff`` that have not
+        been archived yet (no ``expires_at``). Terminal records are not in
+        the active index, so this has to scan the base table.
+        """
+        kwargs: Dict[str, Any] = {
+            "FilterExpression": (
+                Attr("status").is_in(sorted(state.value for state in TERMINAL_STATES))
+                & Attr("timestamp").lt(cutoff)
+                & Attr("expires_at").not_exists()
+            ),
+        }
+        while True:
+            resp = self.table.scan(**kwargs)
+            for item in resp.get("Items", []):
+                yield Runner.from_item(item)
+            if not resp.get("LastEvaluatedKey"):
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def expire(self, runner_ids: List[str], expires_at: int) -> int:
+        """Set the DynamoDB TTL on archived runners. Returns how many were updated."""
+        expired = 0
+        for runner_id in runner_ids:
+            try:
+                self.table.update_item(
+                    Key={"runner_id": runner_id},
+                    UpdateExpression="SET expires_at = :exp",
+                    ConditionExpression="attribute_exists(runner_id)",
+                    ExpressionAttributeValues={":exp": expires_at},
+                )
+            except ClientError as exc:
+                if exc.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+                continue
+            expired += 1
+        return expired
+
+    def get_fleet_summary(self, repo: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Counts per state, class and image plus the oldest waiting timestamp
+        per state, for the fleet or one repo. Reads a single item maintained
+        from the table's stream instead of scanning the table.
+        """
+        if not self.settings.summary_table:
+            raise RuntimeError("Fleet summary table is not configured")
+        if self._summary is None:
+            self._summary = SummaryStore(self.settings)
+        return self._summary.get(repo)
+
+    def heartbeat(self, runner_id: str, timestamp: int) -> bool:
+        """
+        Record a runner heartbeat with a single conditional UpdateItem: no read,
+        no write for unknown runners, and stale (out of order) beats are dropped.
+        """
+        try:
+            self.table.update_item(
+                Key={"runner_id": runner_id},
+                UpdateExpression="SET last_heartbeat = :ts",
+                ConditionExpression=(
+                    "attribute_exists(runner_id) AND "
+                    "(attribute_not_exists(last_heartbeat) OR last_heartbeat < :ts)"
+                ),
+                ExpressionAttributeValues={":ts": timestamp},
+            )
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def complete_job(self, runner_id: str, timestamp: int) -> bool:
+        """
+        Record when a runner's job completed with a single conditional
+        UpdateItem. The earliest report wins, so a later OFFLINE does not
+        stretch the job to the task's shutdown.
+        """
+        try:
+            self.table.update_item(
+                Key={"runner_id": runner_id},
+                UpdateExpression="SET completed_at = :ts",
+                ConditionExpression=(
+                    "attribute_exists(runner_id) AND "
+                    "(attribute_not_exists(completed_at) OR completed_at > :ts)"
+                ),
+                ExpressionAttributeValues={":ts": timestamp},
+            )
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
     def save(self, runner: Runner) -> Runner:
         self.table.put_item(Item=runner.to_item())
         return runner
@@ -0,0 +1,191 @@
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from botocore.exceptions import ClientError
+
+from config import Settings, resource
+from models import Runner, RunnerState, TERMINAL_STATES
+
+FLEET_KEY = "fleet"
+
+# States whose runners are waiting for something; their age is tracked
+WAITING_STATES = frozenset({
+    RunnerState.PENDING,
+    RunnerState.DEFERRED,
+    RunnerState.STARTING,
+    RunnerState.IMAGE_CREATING,
+    RunnerState.WAITING_FOR_JOB,
+})
+
+# Attributes contributions() reads, for projected scans
+SUMMARY_ATTRIBUTES = ("status", "class_name", "image_tag", "timestamp", "repo")
+
+# Replay markers must outlive the 24h stream retention
+MARKER_TTL_SECONDS = 2 * 86400
+
+# Stream sequence numbers are decimal strings of up to 40 digits. Padding
+# lets them be compared as strings without losing precision.
+SEQUENCE_WIDTH = 40
+
+
+def contributions(runner: Optional[Runner]) -> Counter:
+    """
+    Summary attributes a runner record counts towards. Attributes are
+    top-level (``state#RUNNING``, ``class#large``, ``image#ubuntu``,
+    ``waiting#STARTING#<minute>``) so they can be updated with ADD.
+    Class and image counts only include live runners.
+    """
+    counts: Counter = Counter()
+    if runner is None:
+        return counts
+    state = runner.state.value if isinstance(runner.state, RunnerState) else str(runner.state)
+    counts[f"state#{state}"] += 1
+    if runner.state not in TERMINAL_STATES:
+        counts[f"class#{runner.runner_class or 'default'}"] += 1
+        counts[f"image#{runner.image or 'none'}"] += 1
+    if runner.state in WAITING_STATES:
+        minute = int(runner.created_at) // 60 * 60
+        counts[f"waiting#{state}#{minute}"] += 1
+    return counts
+
+
+def parse_summary(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a raw summary item into counts and oldest waiting timestamps."""
+    summary: Dict[str, Any] = {"states": {}, "classes": {}, "images": {}, "oldest_waiting": {}}
+    for attr, value in item.items():
+        kind, _, rest = attr.partition("#")
+        if kind == "state":
+            summary["states"][rest] = int(value)
+        elif kind == "class" and int(value):
+            summary["classes"][rest] = int(value)
+        elif kind == "image" and int(value):
+            summary["images"][rest] = int(value)
+        elif kind == "waiting" and int(value) > 0:
+            state, _, minute = rest.rpartition("#")
+            oldest = summary["oldest_waiting"].get(state)
+            if oldest is None or int(minute) < oldest:
+                summary["oldest_waiting"][state] = int(minute)
+    return summary
+
+
+class SummaryStore:
+    """
+    Fleet summary items maintained from the runner table's stream.
+
+    One item for the whole fleet and one per repository hold the counts;
+    readers fetch a single item. Each stream record that changes a count is
+    applied in a transaction together with a per-runner marker of the last
+    applied sequence number, so replayed or duplicated records are ignored.
+    """
+
+    def __init__(self,
+                 settings: Settings):
+        self.settings = settings
+        dynamodb = resource("dynamodb")
+        self.table = dynamodb.Table(settings.summary_table)
+        self.client = dynamodb.meta.client
+
+    def get(self, repo: Optional[str] = None) -> Dict[str, Any]:
+        key = f"repo#{repo}" if repo else FLEET_KEY
+        item = self.table.get_item(Key={"summary_id": key}).get("Item") or {}
+        item.pop("summary_id", None)
+        return parse_summary(item)
+
+    def apply(self, runner_id: str, sequence: str, old: Optional[Runner], new: Optional[Runner]) -> bool:
+        """
+        Apply the difference between the old and new image of a runner.
+        Returns False if the record was already applied.
+        """
+        deltas = self._deltas(old, new)
+        if not deltas:
+            # Heartbeats, TTL stamps and other updates that leave the counts
+            # alone: nothing to apply, and no replay marker is needed since
+            # replaying them changes nothing either
+            return True
+
+        seq = sequence.zfill(SEQUENCE_WIDTH)
+        items: List[Dict[str, Any]] = [{
+            "Update": {
+                "TableName": self.settings.summary_table,
+                "Key": {"summary_id": f"seq#{runner_id}"},
+                "UpdateExpression": "SET last_seq = :seq, expires_at = :exp",
+                "ConditionExpression": "attribute_not_exists(last_seq) OR last_seq < :seq",
+                "ExpressionAttributeValues": {":seq": seq, ":exp": int(time.time()) + MARKER_TTL_SECONDS},
+            }
+        }]
+        for key, delta in deltas.items():
+            items.append({"Update": self._add_update(key, delta)})
+
+        try:
+            self.client.transact_write_items(TransactItems=items)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                raise
+            reasons = exc.response.get("CancellationReasons", [])
+            if reasons and reasons[0].get("Code") == "ConditionalCheckFailed":
+                return False
+            raise
+
+        for key, delta in deltas.items():
+            emptied = [k for k, v in delta.items() if k.startswith("waiting#") and v < 0]
+            if emptied:
+                self._drop_empty(key, emptied)
+        return True
+
+    def rebuild(self, runners: Iterable[Runner]) -> None:
+        """Overwrite the summary items with counts computed from ``runners``."""
+        totals: Dict[str, Counter] = {FLEET_KEY: Counter()}
+        for runner in runners:
+            counts = contributions(runner)
+            totals[FLEET_KEY].update(counts)
+            if runner.repo:
+                totals.setdefault(f"repo#{runner.repo}", Counter()).update(counts)
+        for key, counts in totals.items():
+            self.table.put_item(Item={"summary_id": key, **counts})
+
+    @staticmethod
+    def _deltas(old: Optional[Runner], new: Optional[Runner]) -> Dict[str, Counter]:
+        """Per summary item, the non-zero attribute changes from old to new."""
+        deltas: Dict[str, Counter] = {}
+        for runner, sign in ((old, -1), (new, 1)):
+            if runner is None:
+                continue
+            keys = [FLEET_KEY] + ([f"repo#{runner.repo}"] if runner.repo else [])
+            for attr, count in contributions(runner).items():
+                for key in keys:
+                    deltas.setdefault(key, Counter())[attr] += sign * count
+        return {
+            key: Counter({k: v for k, v in delta.items() if v})
+            for key, delta in deltas.items()
+            if any(delta.values())
+        }
+
+    def _add_update(self, key: str, delta: Counter) -> Dict[str, Any]:
+        names, values, parts = {}, {}, []
+        for i, (attr, value) in enumerate(sorted(delta.items())):
+            names[f"#a{i}"] = attr
+            values[f":v{i}"] = value
+            parts.append(f"#a{i} :v{i}")
+        return {
+            "TableName": self.settings.summary_table,
+            "Key": {"summary_id": key},
+            "UpdateExpression": "ADD " + ", ".join(parts),
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": values,
+        }
+
+    def _drop_empty(self, key: str, attrs: List[str]) -> None:
+        """Remove waiting buckets that reached zero so the item stays small."""
+        for attr in attrs:
+            try:
+                self.table.update_item(
+                    Key={"summary_id": key},
+                    UpdateExpression="REMOVE #a",
+                    ConditionExpression="#a = :zero",
+                    ExpressionAttributeNames={"#a": attr},
+                    ExpressionAttributeValues={":zero": 0},
+                )
+            except ClientError as exc:
+                if exc.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
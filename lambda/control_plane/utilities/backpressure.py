@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_ERROR_CODES = frozenset({
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "SlowDown",
+})
+
+# (rate per second, burst) per (service, operation). Kept below the published
+# ECS/ECR account limits so a burst of Lambdas backs off before AWS does it for us.
+DEFAULT_RATE_LIMITS: Dict[Tuple[str, str], Tuple[float, float]] = {
+    ("ecs", "RunTask"): (20.0, 40.0),
+    ("ecs", "RegisterTaskDefinition"): (1.0, 5.0),
+    ("ecr", "DescribeImages"): (10.0, 20.0),
+}
+
+# Operations refused outright while the service's breaker is open. Only these
+# operations feed the breaker: a StopTask or DescribeTasks succeeding says
+# nothing about whether RunTask is still being throttled.
+CIRCUIT_GUARDED_OPERATIONS: Dict[str, frozenset] = {
+    "ecs": frozenset({"RunTask", "RegisterTaskDefinition"}),
+}
+
+DEFAULT_ACQUIRE_TIMEOUT = 2.0
+
+
+class BackpressureError(RuntimeError):
+    """Raised when a call is refused locally to protect an upstream API."""
+
+
+class RateLimitExceeded(BackpressureError):
+    """No token became available within the acquire timeout."""
+
+
+class CircuitOpenError(BackpressureError):
+    """The service is throttling hard and the breaker is refusing calls."""
+
+
+def is_throttling_error(exc: BaseException) -> bool:
+    """Return True if ``exc`` is an AWS throttling error."""
+    if not isinstance(exc, ClientError):
+        return False
+    return exc.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+def is_deferrable(exc: BaseException) -> bool:
+    """
+    Return True if a launch that failed with ``exc`` should be parked and
+    retried later: refused locally, or still throttled by AWS after retries.
+    """
+    return isinstance(exc, BackpressureError) or is_throttling_error(exc)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with additive-increase/multiplicative-decrease
+    of its refill rate: throttles halve it, successes slowly restore it.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst: float,
+            min_rate: float | None = None,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available, else return seconds until they would be."""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, timeout: float = DEFAULT_ACQUIRE_TIMEOUT, tokens: float = 1.0) -> bool:
+        """Block until tokens are taken; give up if that would exceed ``timeout``."""
+        deadline = self._clock() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return True
+            if self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``threshold`` throttles within ``window`` seconds. While open,
+    one probe call is let through every ``cooldown`` seconds; a successful
+    probe closes the breaker, a throttled one keeps it open.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            threshold: int = 5,
+            window: float = 30.0,
+            cooldown: float = 60.0,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._clock = clock
+        self._throttles: Deque[float] = deque()
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = self._clock()
+            if now - self._opened_at >= self.cooldown:
+                # Re-arm so only one probe goes out per cooldown period
+                self._opened_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit %s closed", self.name)
+            self._opened_at = None
+            self._throttles.clear()
+
+    def record_throttle(self) -> None:
+        with self._lock:
+            now = self._clock()
+            self._throttles.append(now)
+            while self._throttles and now - self._throttles[0] > self.window:
+                self._throttles.popleft()
+            if self._opened_at is not None:
+                self._opened_at = now
+            elif len(self._throttles) >= self.threshold:
+                logger.warning("Circuit %s opened after %d throttles", self.name, len(self._throttles))
+                self._opened_at = now
+
+
+_registry_lock = threading.Lock()
+_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_bucket(service: str, operation: str) -> Optional[TokenBucket]:
+    """Return the process-wide limiter for an operation, if one is configured."""
+    key = (service, operation)
+    limits = DEFAULT_RATE_LIMITS.get(key)
+    if limits is None:
+        return None
+    with _registry_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(*limits)
+        return _buckets[key]
+
+
+def get_breaker(service: str) -> Optional[CircuitBreaker]:
+    """Return the process-wide breaker for a service, if one is configured."""
+    if service not in CIRCUIT_GUARDED_OPERATIONS:
+        return None
+    with _registry_lock:
+        if service not in _breakers:
+            _breakers[service] = CircuitBreaker(service)
+        return _breakers[service]
+
+
+def reset() -> None:
+    """Drop all limiter and breaker state."""
+    with _registry_lock:
+        _buckets.clear()
+        _breakers.clear()
+
+
+class ThrottledClient:
+    """
+    Proxy around a boto3 client. Every API operation goes through the
+    operation's token bucket, and guarded operations also through the
+    service's circuit breaker; everything else (``exceptions``, ``meta``,
+    paginators...) is passed through.
+    """
+
+    def __init__(self, client, service: str, acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT):
+        self._client = client
+        self._service = service
+        self._acquire_timeout = acquire_timeout
+        self._operations: Dict[str, str] = client.meta.method_to_api_mapping
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        operation = self._operations.get(name)
+        if operation is None:
+            return attr
+        return functools.partial(self._call, attr, operation)
+
+    def _call(self, method: Callable[..., Any], operation: str, *args, **kwargs) -> Any:
+        guarded = operation in CIRCUIT_GUARDED_OPERATIONS.get(self._service, ())
+        breaker = get_breaker(self._service) if guarded else None
+        if breaker and not breaker.allow():
+            raise CircuitOpenError(f"{self._service} circuit open, refusing {operation}")
+
+        bucket = get_bucket(self._service, operation)
+        if bucket and not bucket.acquire(self._acquire_timeout):
+            raise RateLimitExceeded(f"{self._service}.{operation} rate limit exceeded")
+
+        try:
+            result = method(*args, **kwargs)
+        except ClientError as exc:
+            if is_throttling_error(exc):
+                logger.warning("%s.%s throttled after retries", self._service, operation)
+                if bucket:
+                    bucket.on_throttle()
+                if breaker:
+                    breaker.record_throttle()
+            raise
+        if bucket:
+            bucket.on_success()
+        if breaker:
+            breaker.record_success()
+        return result
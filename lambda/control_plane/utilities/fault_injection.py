@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import functools
+import random
+from typing import Any, Callable, Iterable, Optional
+
+from botocore.exceptions import ClientError
+
+
+class ThrottlingFaultInjector:
+    """
+    Test harness wrapping a boto3 client: a fraction of API calls fail with a
+    synthetic throttling error instead of reaching AWS. Used to exercise the
+    backpressure layer (see ``utilities.backpressure``) without a real burst.
+
+    Enable in a deployed control plane with ``FAULT_INJECT_THROTTLE_RATE``.
+    """
+
+    def __init__(
+            self,
+            client,
+            rate: float,
+            operations: Optional[Iterable[str]] = None,
+            error_code: str = "ThrottlingException",
+            seed: Optional[int] = None,
+    ):
+        self._client = client
+        self.rate = rate
+        self.operations = frozenset(operations) if operations else None
+        self.error_code = error_code
+        self.injected = 0
+        self._random = random.Random(seed)
+        self._mapping = client.meta.method_to_api_mapping
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        operation = self._mapping.get(name)
+        if operation is None or (self.operations and operation not in self.operations):
+            return attr
+        return functools.partial(self._call, attr, operation)
+
+    def _call(self, method: Callable[..., Any], operation: str, *args, **kwargs) -> Any:
+        if self._random.random() < self.rate:
+            self.injected += 1
+            raise ClientError(
+                {
+                    "Error": {"Code": self.error_code, "Message": "Synthetic throttle"},
+                    "ResponseMetadata": {"HTTPStatusCode": 400},
+                },
+                operation,
+            )
+        return method(*args, **kwargs)
@@ -1,30 +1,234 @@
 from __future__ import annotations
 
 import json
+import logging
+import threading
+import time
+import urllib.error
 import urllib.request
 import hashlib
 import hmac
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
 
 from config import Settings
 
+logger = logging.getLogger(__name__)
 
-def get_runner_token(settings: Settings) -> str:
-    url = (
-        f"https://api.github.com/repos/{settings.github_repo}/actions/"
-        "runners/registration-token"
-    )
-    req = urllib.request.Request(
-        url,
-        method="POST",
-        headers={
-            "Authorization": f"token {settings.github_pat}",
+API_URL = "https://api.github.com"
+
+# Refresh installation tokens this long before GitHub expires them
+TOKEN_REFRESH_MARGIN = 300
+
+
+class RateLimitTracker:
+    """
+    Tracks ``X-RateLimit-*`` response headers for one credential and paces
+    requests once the remaining budget drops below ``threshold`` of the
+    limit, spreading what is left over the time until the window resets.
+    """
+
+    def __init__(self, threshold: float = 0.1, max_delay: float = 5.0):
+        self.threshold = threshold
+        self.max_delay = max_delay
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[int] = None
+
+    def update(self, headers) -> None:
+        try:
+            if headers.get("X-RateLimit-Limit") is not None:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if headers.get("X-RateLimit-Remaining") is not None:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if headers.get("X-RateLimit-Reset") is not None:
+                self.reset_at = int(headers["X-RateLimit-Reset"])
+        except (TypeError, ValueError):
+            logger.debug("Ignoring malformed rate limit headers")
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Seconds to wait before the next request on this credential."""
+        if self.limit is None or self.remaining is None or self.reset_at is None:
+            return 0.0
+        now = time.time() if now is None else now
+        window = self.reset_at - now
+        if window <= 0 or self.remaining > self.limit * self.threshold:
+            return 0.0
+        return min(self.max_delay, window / max(self.remaining, 1))
+
+
+class GitHubClient:
+    """
+    Minimal GitHub REST client for the control plane.
+
+    Authenticates as a GitHub App when ``github_app_id`` and
+    ``github_app_private_key`` are configured: an app JWT is exchanged for
+    installation tokens, which are cached per installation and refreshed
+    shortly before they expire. Falls back to ``github_pat`` otherwise.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._jwt: Optional[Tuple[str, int]] = None
+        self._installation_tokens: Dict[int, Tuple[str, int]] = {}
+        self._installation_ids: Dict[str, int] = {}
+        self._rate_limits: Dict[str, RateLimitTracker] = {}
+
+    @property
+    def uses_app(self) -> bool:
+        return bool(self.settings.github_app_id and self.settings.github_app_private_key)
+
+    # ---- authentication ----
+
+    def _app_jwt(self) -> str:
+        now = int(time.time())
+        with self._lock:
+            if self._jwt and self._jwt[1] - 60 > now:
+                return self._jwt[0]
+            # Backdate iat for clock drift; GitHub caps exp at 10 minutes
+            exp = now + 540
+            key = self.settings.github_app_private_key.replace("\\n", "\n")
+            token = jwt.encode(
+                {"iat": now - 60, "exp": exp, "iss": str(self.settings.github_app_id)},
+                key,
+                algorithm="RS256",
+            )
+            self._jwt = (token, exp)
+            return token
+
+    def installation_id(self, repo: str) -> int:
+        """Return the app installation covering ``repo`` (owner/name)."""
+        if self.settings.github_app_installation_id:
+            return self.settings.github_app_installation_id
+        owner = repo.split("/", 1)[0]
+        if owner not in self._installation_ids:
+            data = self._request("GET", f"/repos/{repo}/installation", f"Bearer {self._app_jwt()}", "app")
+            self._installation_ids[owner] = int(data["id"])
+        return self._installation_ids[owner]
+
+    def installation_token(self, installation_id: int) -> str:
+        now = int(time.time())
+        cached = self._installation_tokens.get(installation_id)
+        if cached and cached[1] - TOKEN_REFRESH_MARGIN > now:
+            return cached[0]
+        data = self._request(
+            "POST",
+            f"/app/installations/{installation_id}/access_tokens",
+            f"Bearer {self._app_jwt()}",
+            "app",
+        )
+        expires_at = int(datetime.fromisoformat(data["expires_at"].replace("Z", "+00:00")).timestamp())
+        self._installation_tokens[installation_id] = (data["token"], expires_at)
+        logger.info("Refreshed installation token for %s", installation_id)
+        return data["token"]
+
+    def _auth_for(self, repo: str) -> Tuple[str, str]:
+        """Return the Authorization header and the rate limit bucket it draws from."""
+        if self.uses_app:
+            installation_id = self.installation_id(repo)
+            return f"token {self.installation_token(installation_id)}", f"installation:{installation_id}"
+        if not self.settings.github_pat:
+            raise RuntimeError("Neither GitHub App credentials nor a PAT are configured")
+        return f"token {self.settings.github_pat}", "pat"
+
+    # ---- requests ----
+
+    def _request(
+            self, method: str, path: str, auth: str, limit_key: str, body: Optional[dict] = None
+    ) -> Any:
+        tracker = self._rate_limits.setdefault(limit_key, RateLimitTracker())
+        wait = tracker.delay()
+        if wait:
+            logger.warning("GitHub rate limit low (%s left), pausing %.2fs", tracker.remaining, wait)
+            time.sleep(wait)
+
+        headers = {
+            "Authorization": auth,
             "Accept": "application/vnd.github+json",
-        },
+        }
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(f"{API_URL}{path}", method=method, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(req) as resp:
+                tracker.update(resp.headers)
+                raw = resp.read()
+                # DELETE answers 204 without a body
+                return json.loads(raw) if raw else None
+        except urllib.error.HTTPError as exc:
+            tracker.update(exc.headers)
+            raise
+
+    def request(self, method: str, path: str, repo: str, body: Optional[dict] = None) -> Any:
+        """Call the GitHub API on behalf of ``repo``."""
+        auth, limit_key = self._auth_for(repo)
+        return self._request(method, path, auth, limit_key, body)
+
+
+_clients: Dict[Tuple, GitHubClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(settings: Settings) -> GitHubClient:
+    """
+    Return the process-wide client for the configured credentials so token
+    caches survive across invocations and Settings instances.
+    """
+    key = (
+        settings.github_app_id,
+        settings.github_app_private_key,
+        settings.github_app_installation_id,
+        settings.github_pat,
+    )
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = GitHubClient(settings)
+        return _clients[key]
+
+
+def get_runner_token(settings: Settings, repo: Optional[str] = None) -> str:
+    repo = repo or settings.github_repo
+    data = get_client(settings).request(
+        "POST", f"/repos/{repo}/actions/runners/registration-token", repo
     )
-    with urllib.request.urlopen(req) as resp:
-        data = json.load(resp)
     return data["token"]
 
+def generate_jit_config(
+        settings: Settings, name: str, labels: List[str], repo: Optional[str] = None
+) -> str:
+    """
+    Create a just-in-time configuration for an ephemeral runner. The runner
+    is registered by GitHub up front, so the container can start ``run.sh``
+    directly and is removed by GitHub after its single job.
+    """
+    return create_jit_runner(settings, name, labels, repo)[1]
+
+def create_jit_runner(
+        settings: Settings, name: str, labels: List[str], repo: Optional[str] = None
+) -> Tuple[int, str]:
+    """Like :func:`generate_jit_config`, also returning GitHub's runner id."""
+    repo = repo or settings.github_repo
+    body = {
+        "name": name,
+        "runner_group_id": settings.runner_group_id,
+        "labels": labels,
+        "work_folder": "_work",
+    }
+    data = get_client(settings).request(
+        "POST", f"/repos/{repo}/actions/runners/generate-jitconfig", repo, body
+    )
+    return int(data["runner"]["id"]), data["encoded_jit_config"]
+
+def delete_runner(settings: Settings, runner_id: int, repo: Optional[str] = None) -> None:
+    """Remove a registered runner that will never be started."""
+    repo = repo or settings.github_repo
+    get_client(settings).request("DELETE", f"/repos/{repo}/actions/runners/{runner_id}", repo)
+
 def verify_github_signature(body: bytes, secret: str, signature: str) -> bool:
     """Verify GitHub webhook signature (X-Hub-Signature-256)."""
     expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
@@ -6,3 +6,11 @@ import re
 def sanitize_image_label(label: str) -> str:
     """Sanitize a label so it can be used as an ECR tag or ECS family name."""
     return re.sub(r"[^a-zA-Z0-9_-]", "-", label)
+
+
+def base_image_from_labels(labels: str) -> str | None:
+    """Return the ``image:<base>`` value from a comma separated label string."""
+    for lbl in labels.split(","):
+        if lbl.startswith("image:"):
+            return lbl.split(":", 1)[1]
+    return None
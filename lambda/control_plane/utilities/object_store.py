@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+
+from config import client
+
+
+class ObjectStore(ABC):
+    """Minimal write-only object store used by the archiver."""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> str:
+        """Store ``data`` under ``key`` and return its URI."""
+
+
+class S3ObjectStore(ObjectStore):
+    def __init__(self, bucket: str, prefix: str = ""):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = client("s3")
+
+    def put(self, key: str, data: bytes) -> str:
+        key = f"{self.prefix}/{key}" if self.prefix else key
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        return f"s3://{self.bucket}/{key}"
+
+
+class LocalObjectStore(ObjectStore):
+    """Writes objects below a local directory, e.g. for development."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def put(self, key: str, data: bytes) -> str:
+        path = os.path.join(self.root, *key.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write aside and rename so readers never see a partial file
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        return path
+
+
+def open_object_store(url: str) -> ObjectStore:
+    """``s3://bucket/prefix`` for S3, anything else is a local directory."""
+    parsed = urlparse(url)
+    if parsed.scheme == "s3":
+        return S3ObjectStore(parsed.netloc, parsed.path)
+    if parsed.scheme == "file":
+        return LocalObjectStore(parsed.path)
+    return LocalObjectStore(url)
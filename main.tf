@@ -8,9 +8,16 @@ module "control_plane" {
   ecs_subnet_ids        = var.subnet_ids
   security_groups       = var.security_groups
   github_pat            = var.github_pat
+  github_app_id         = var.github_app_id
+  github_app_private_key     = var.github_app_private_key
+  github_app_installation_id = var.github_app_installation_id
   github_repo           = var.github_repo
+  github_repos          = var.github_repos
   webhook_secret        = var.webhook_secret
   runner_class_sizes    = var.runner_class_sizes
+  runner_quotas         = var.runner_quotas
+  archive_bucket        = var.archive_bucket
+  archive_after_days    = var.archive_after_days
   event_bus_name        = var.event_bus_name
   runner_repository_url = module.ecs_fleet.repository_url
   runner_image_tag      = var.runner_image_tag
@@ -3,10 +3,105 @@ resource "aws_dynamodb_table" "runner_status" {
   billing_mode = "PAY_PER_REQUEST"
   hash_key     = "runner_id"
 
+  # Feeds the fleet summary
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
+  # Set by the archiver once a record is in the archive
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   attribute {
     name = "runner_id"
     type = "S"
   }
+
+  attribute {
+    name = "job_id"
+    type = "S"
+  }
+
+  attribute {
+    name = "active_repo"
+    type = "S"
+  }
+
+  attribute {
+    name = "timestamp"
+    type = "N"
+  }
+
+  global_secondary_index {
+    name            = "job_id-index"
+    hash_key        = "job_id"
+    projection_type = "ALL"
+  }
+
+  attribute {
+    name = "pending_repo"
+    type = "S"
+  }
+
+  # Sparse: only non-terminal runners carry active_repo
+  global_secondary_index {
+    name            = "repo-active-index"
+    hash_key        = "active_repo"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
+
+  # Sparse: only runners waiting for quota carry pending_repo
+  global_secondary_index {
+    name            = "repo-pending-index"
+    hash_key        = "pending_repo"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
+}
+
+resource "aws_dynamodb_table" "runner_quotas" {
+  name         = "runner-quotas"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "scope"
+
+  attribute {
+    name = "scope"
+    type = "S"
+  }
+}
+
+resource "aws_dynamodb_table" "fleet_summary" {
+  name         = "runner-fleet-summary"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "summary_id"
+
+  attribute {
+    name = "summary_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
+
+resource "aws_dynamodb_table" "webhook_deliveries" {
+  name         = "runner-webhook-deliveries"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "dedupe_key"
+
+  attribute {
+    name = "dedupe_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
 }
 
 resource "aws_cloudwatch_event_bus" "control_plane" {
@@ -63,12 +158,58 @@ data "aws_iam_policy_document" "lambda_policy" {
       "dynamodb:PutItem",
       "dynamodb:UpdateItem"
     ]
-    resources = [aws_dynamodb_table.runner_status.arn]
+    resources = [
+      aws_dynamodb_table.runner_status.arn,
+      "${aws_dynamodb_table.runner_status.arn}/index/*"
+    ]
+  }
+
+  statement {
+    actions = [
+      "dynamodb:PutItem",
+      "dynamodb:DeleteItem"
+    ]
+    resources = [aws_dynamodb_table.webhook_deliveries.arn]
+  }
+
+  statement {
+    actions = [
+      "dynamodb:GetItem",
+      "dynamodb:UpdateItem"
+    ]
+    resources = [aws_dynamodb_table.runner_quotas.arn]
+  }
+
+  statement {
+    actions = [
+      "dynamodb:GetRecords",
+      "dynamodb:GetShardIterator",
+      "dynamodb:DescribeStream",
+      "dynamodb:ListStreams"
+    ]
+    resources = [aws_dynamodb_table.runner_status.stream_arn]
+  }
+
+  statement {
+    actions = [
+      "dynamodb:GetItem",
+      "dynamodb:PutItem",
+      "dynamodb:UpdateItem"
+    ]
+    resources = [aws_dynamodb_table.fleet_summary.arn]
+  }
+
+  dynamic "statement" {
+    for_each = var.archive_bucket == "" ? [] : [var.archive_bucket]
+    content {
+      actions   = ["s3:PutObject"]
+      resources = ["arn:aws:s3:::${statement.value}/runner-archive/*"]
+    }
   }
 
   statement {
     actions = ["ssm:GetParameter"]
-    resources = [aws_ssm_parameter.class_sizes.arn]
+    resources = [aws_ssm_parameter.class_sizes.arn, aws_ssm_parameter.quotas.arn]
   }
 
   statement {
@@ -151,6 +292,12 @@ resource "aws_ssm_parameter" "class_sizes" {
   value = jsonencode(var.runner_class_sizes)
 }
 
+resource "aws_ssm_parameter" "quotas" {
+  name  = "/ecs-runner/quotas"
+  type  = "String"
+  value = jsonencode(var.runner_quotas)
+}
+
 resource "aws_lambda_function" "control_plane" {
   filename         = data.archive_file.lambda_zip.output_path
   function_name    = "runner-control-plane"
@@ -158,6 +305,8 @@ resource "aws_lambda_function" "control_plane" {
   handler          = "handler.lambda_handler"
   runtime          = "python3.12"
   source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  # API Gateway HTTP APIs time out integrations after 30s
+  timeout          = 30
 
   environment {
     variables = {
@@ -165,10 +314,16 @@ resource "aws_lambda_function" "control_plane" {
       SUBNETS = join(",", var.ecs_subnet_ids)
       SECURITY_GROUPS = join(",", var.security_groups)
       GITHUB_PAT            = var.github_pat
+      GITHUB_APP_ID         = var.github_app_id
+      GITHUB_APP_PRIVATE_KEY     = var.github_app_private_key
+      GITHUB_APP_INSTALLATION_ID = var.github_app_installation_id
       GITHUB_REPO           = var.github_repo
+      GITHUB_REPOS          = join(",", var.github_repos)
       GITHUB_WEBHOOK_SECRET = var.webhook_secret
       RUNNER_TABLE          = aws_dynamodb_table.runner_status.name
       CLASS_SIZES_PARAM     = aws_ssm_parameter.class_sizes.name
+      QUOTA_TABLE           = length(var.runner_quotas) > 0 ? aws_dynamodb_table.runner_quotas.name : ""
+      QUOTAS_PARAM          = aws_ssm_parameter.quotas.name
       RUNNER_REPOSITORY_URL = var.runner_repository_url
       RUNNER_IMAGE_TAG      = var.runner_image_tag
       IMAGE_BUILD_PROJECT   = var.image_build_project
@@ -177,6 +332,10 @@ resource "aws_lambda_function" "control_plane" {
       LOG_GROUP_NAME        = var.log_group_name
       EVENT_BUS_NAME        = var.event_bus_name
       RUNNER_TTL_SECONDS    = var.runner_ttl_seconds
+      DEDUPE_TABLE          = aws_dynamodb_table.webhook_deliveries.name
+      DEDUPE_TTL_SECONDS    = var.dedupe_ttl_seconds
+      HEARTBEAT_INTERVAL_SECONDS = var.heartbeat_interval_seconds
+      SUMMARY_TABLE         = aws_dynamodb_table.fleet_summary.name
     }
   }
 }
@@ -188,6 +347,7 @@ resource "aws_lambda_function" "janitor" {
   handler          = "janitor.lambda_handler"
   runtime          = "python3.12"
   source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  timeout          = 300
 
   environment {
     variables = {
@@ -195,19 +355,61 @@ resource "aws_lambda_function" "janitor" {
       SUBNETS = join(",", var.ecs_subnet_ids)
       SECURITY_GROUPS = join(",", var.security_groups)
       GITHUB_PAT            = var.github_pat
+      GITHUB_APP_ID         = var.github_app_id
+      GITHUB_APP_PRIVATE_KEY     = var.github_app_private_key
+      GITHUB_APP_INSTALLATION_ID = var.github_app_installation_id
       GITHUB_REPO           = var.github_repo
+      GITHUB_REPOS          = join(",", var.github_repos)
       RUNNER_TABLE          = aws_dynamodb_table.runner_status.name
       CLASS_SIZES_PARAM     = aws_ssm_parameter.class_sizes.name
+      QUOTA_TABLE           = length(var.runner_quotas) > 0 ? aws_dynamodb_table.runner_quotas.name : ""
+      QUOTAS_PARAM          = aws_ssm_parameter.quotas.name
       RUNNER_REPOSITORY_URL = var.runner_repository_url
       EXECUTION_ROLE_ARN    = var.execution_role_arn
       TASK_ROLE_ARN         = var.task_role_arn
       LOG_GROUP_NAME        = var.log_group_name
       EVENT_BUS_NAME        = var.event_bus_name
       RUNNER_TTL_SECONDS    = var.runner_ttl_seconds
+      IDLE_TIMEOUT_SECONDS  = var.idle_timeout_seconds
+      HEARTBEAT_TIMEOUT_SECONDS = var.heartbeat_timeout_seconds
+      SUMMARY_TABLE         = aws_dynamodb_table.fleet_summary.name
+    }
+  }
+}
+
+resource "aws_lambda_function" "fleet_summary" {
+  filename         = data.archive_file.lambda_zip.output_path
+  function_name    = "runner-fleet-summary"
+  role             = aws_iam_role.lambda.arn
+  handler          = "fleet_summary.lambda_handler"
+  runtime          = "python3.12"
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+
+  environment {
+    variables = {
+      CLUSTER               = var.ecs_cluster
+      SUBNETS = join(",", var.ecs_subnet_ids)
+      SECURITY_GROUPS = join(",", var.security_groups)
+      GITHUB_WEBHOOK_SECRET = var.webhook_secret
+      RUNNER_TABLE          = aws_dynamodb_table.runner_status.name
+      RUNNER_REPOSITORY_URL = var.runner_repository_url
+      EXECUTION_ROLE_ARN    = var.execution_role_arn
+      TASK_ROLE_ARN         = var.task_role_arn
+      LOG_GROUP_NAME        = var.log_group_name
+      EVENT_BUS_NAME        = var.event_bus_name
+      SUMMARY_TABLE         = aws_dynamodb_table.fleet_summary.name
     }
   }
 }
 
+resource "aws_lambda_event_source_mapping" "fleet_summary" {
+  event_source_arn        = aws_dynamodb_table.runner_status.stream_arn
+  function_name           = aws_lambda_function.fleet_summary.arn
+  starting_position       = "TRIM_HORIZON"
+  batch_size              = 100
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
 resource "aws_cloudwatch_event_rule" "janitor" {
   name                = "runner-janitor"
   schedule_expression = var.janitor_schedule_expression
@@ -227,6 +429,76 @@ resource "aws_lambda_permission" "allow_janitor_events" {
   source_arn    = aws_cloudwatch_event_rule.janitor.arn
 }
 
+# pyarrow is only needed by the archiver, so it ships in its own layer
+# instead of growing the package every other Lambda loads
+data "archive_file" "archiver_layer_zip" {
+  count       = var.archive_bucket == "" ? 0 : 1
+  type        = "zip"
+  source_dir  = "${path.module}/../../lambda/archiver_layer"
+  excludes    = ["requirements.txt"]
+  output_path = "../archiver_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "archiver" {
+  count               = var.archive_bucket == "" ? 0 : 1
+  layer_name          = "runner-archiver-deps"
+  filename            = data.archive_file.archiver_layer_zip[0].output_path
+  source_code_hash    = data.archive_file.archiver_layer_zip[0].output_base64sha256
+  compatible_runtimes = ["python3.12"]
+}
+
+resource "aws_lambda_function" "archiver" {
+  count            = var.archive_bucket == "" ? 0 : 1
+  filename         = data.archive_file.lambda_zip.output_path
+  function_name    = "runner-archiver"
+  role             = aws_iam_role.lambda.arn
+  handler          = "archiver.lambda_handler"
+  runtime          = "python3.12"
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  layers           = [aws_lambda_layer_version.archiver[0].arn]
+  timeout          = 900
+  memory_size      = 1024
+
+  environment {
+    variables = {
+      CLUSTER               = var.ecs_cluster
+      SUBNETS = join(",", var.ecs_subnet_ids)
+      SECURITY_GROUPS = join(",", var.security_groups)
+      GITHUB_WEBHOOK_SECRET = var.webhook_secret
+      RUNNER_TABLE          = aws_dynamodb_table.runner_status.name
+      RUNNER_REPOSITORY_URL = var.runner_repository_url
+      EXECUTION_ROLE_ARN    = var.execution_role_arn
+      TASK_ROLE_ARN         = var.task_role_arn
+      LOG_GROUP_NAME        = var.log_group_name
+      EVENT_BUS_NAME        = var.event_bus_name
+      ARCHIVE_URL           = "s3://${var.archive_bucket}/runner-archive"
+      ARCHIVE_AFTER_DAYS    = var.archive_after_days
+    }
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "archiver" {
+  count               = var.archive_bucket == "" ? 0 : 1
+  name                = "runner-archiver"
+  schedule_expression = var.archive_schedule_expression
+}
+
+resource "aws_cloudwatch_event_target" "archiver" {
+  count     = var.archive_bucket == "" ? 0 : 1
+  rule      = aws_cloudwatch_event_rule.archiver[0].name
+  target_id = "runner-archiver"
+  arn       = aws_lambda_function.archiver[0].arn
+}
+
+resource "aws_lambda_permission" "allow_archiver_events" {
+  count         = var.archive_bucket == "" ? 0 : 1
+  statement_id  = "AllowEventBridgeInvokeArchiver"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.archiver[0].function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.archiver[0].arn
+}
+
 resource "aws_apigatewayv2_api" "webhook_api" {
   name          = "github-webhook"
   protocol_type = "HTTP"
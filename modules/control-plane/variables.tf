@@ -14,13 +14,21 @@ variable "security_groups" {
 }
 
 variable "github_pat" {
-  description = "GitHub personal access token"
+  description = "GitHub personal access token (fallback when no GitHub App is configured)"
   type        = string
+  default     = ""
 }
 
 variable "github_repo" {
-  description = "GitHub repository for runners"
+  description = "GitHub repository for runners (single-repository mode)"
   type        = string
+  default     = ""
+}
+
+variable "github_repos" {
+  description = "Additional repositories served by this control plane: owner/name, or owner/* for a whole organization"
+  type        = list(string)
+  default     = []
 }
 
 variable "webhook_secret" {
@@ -31,8 +39,9 @@ variable "webhook_secret" {
 variable "runner_class_sizes" {
   description = "Map of runner class sizes and their cpu/memory settings"
   type = map(object({
-    cpu    = number
-    memory = number
+    cpu          = number
+    memory       = number
+    idle_timeout = optional(number)
   }))
   default = {
     small  = { cpu = 512, memory = 1024 }
@@ -90,3 +99,70 @@ variable "janitor_schedule_expression" {
   type        = string
   default     = "rate(5 minutes)"
 }
+
+variable "dedupe_ttl_seconds" {
+  description = "How long processed webhook delivery and job IDs are remembered for deduplication"
+  type        = number
+  default     = 86400
+}
+
+variable "idle_timeout_seconds" {
+  description = "Default time a runner may wait for a job before the reaper stops it (per-class idle_timeout overrides)"
+  type        = number
+  default     = 900
+}
+
+variable "heartbeat_interval_seconds" {
+  description = "Interval between runner container heartbeats"
+  type        = number
+  default     = 60
+}
+
+variable "heartbeat_timeout_seconds" {
+  description = "Time without heartbeats after which a runner is considered dead and stopped"
+  type        = number
+  default     = 300
+}
+
+variable "github_app_id" {
+  description = "GitHub App ID used to authenticate instead of the PAT"
+  type        = string
+  default     = ""
+}
+
+variable "github_app_private_key" {
+  description = "PEM private key of the GitHub App"
+  type        = string
+  default     = ""
+  sensitive   = true
+}
+
+variable "github_app_installation_id" {
+  description = "GitHub App installation ID (looked up per repository owner when empty)"
+  type        = string
+  default     = ""
+}
+
+variable "runner_quotas" {
+  description = "Fair-share quotas: {repos|classes|labels = {<key>|default = {max_runners, vcpus, weight}}}. Empty disables admission control."
+  type        = any
+  default     = {}
+}
+
+variable "archive_bucket" {
+  description = "S3 bucket for the runner record archive (s3://<bucket>/runner-archive). Empty disables archiving."
+  type        = string
+  default     = ""
+}
+
+variable "archive_after_days" {
+  description = "Archive OFFLINE/FAILED runner records older than this many days, then expire them from DynamoDB"
+  type        = number
+  default     = 30
+}
+
+variable "archive_schedule_expression" {
+  description = "EventBridge schedule expression for the archiver"
+  type        = string
+  default     = "rate(1 day)"
+}
@@ -2,19 +2,25 @@
 
 set -e
 
-if [ -z "$RUNNER_REPOSITORY_URL" ] || [ -z "$RUNNER_TOKEN" ]; then
-  echo "RUNNER_REPOSITORY_URL and RUNNER_TOKEN must be set"
-  exit 1
-fi
+# A just-in-time config from the control plane registers an ephemeral runner
+# up front; otherwise register here with a registration token.
+if [ -z "$RUNNER_JIT_CONFIG" ]; then
+  if [ -z "$RUNNER_REPOSITORY_URL" ] || [ -z "$RUNNER_TOKEN" ]; then
+    echo "RUNNER_JIT_CONFIG or RUNNER_REPOSITORY_URL and RUNNER_TOKEN must be set"
+    exit 1
+  fi
 
-./config.sh --unattended \
-    --url "$RUNNER_REPOSITORY_URL" \
-    --token "$RUNNER_TOKEN" \
-    --labels "${RUNNER_LABELS:-ecs-fargate}" \
-    --name "${RUNNER_NAME:-fargate-runner}"
+  ./config.sh --unattended \
+      --url "$RUNNER_REPOSITORY_URL" \
+      --token "$RUNNER_TOKEN" \
+      --labels "${RUNNER_LABELS:-ecs-fargate}" \
+      --name "${RUNNER_NAME:-fargate-runner}"
+fi
 
-# unique id for this runner
-if [ -n "$ECS_CONTAINER_METADATA_URI_V4" ]; then
+# unique id for this runner; the control plane passes its runner record id
+if [ -n "$RUNNER_ID" ]; then
+  export RUNNER_ID
+elif [ -n "$ECS_CONTAINER_METADATA_URI_V4" ]; then
   TASK_ARN=$(curl -s "$ECS_CONTAINER_METADATA_URI_V4/task" | jq -r '.TaskARN')
   TASK_ID=${TASK_ARN##*/}
   export RUNNER_ID="${RUNNER_NAME:-fargate-runner}-${TASK_ID}"
@@ -25,13 +31,34 @@ fi
 # mark runner initially idle
 [ -n "$EVENT_BUS_NAME" ] && /home/runner/runner_status.sh idle || true
 
+# periodic liveness signal for the control plane's idle/dead runner reaper
+HEARTBEAT_PID=""
+if [ -n "$EVENT_BUS_NAME" ]; then
+  while true; do
+    sleep "${HEARTBEAT_INTERVAL:-60}"
+    /home/runner/runner_status.sh HEARTBEAT || true
+  done &
+  HEARTBEAT_PID=$!
+fi
+
 cleanup() {
     echo "Removing runner..."
+    [ -n "$HEARTBEAT_PID" ] && kill "$HEARTBEAT_PID" 2>/dev/null || true
     [ -n "$EVENT_BUS_NAME" ] && /home/runner/runner_status.sh OFFLINE || true
-    ./config.sh remove --unattended --token "$RUNNER_TOKEN"
+    # JIT runners are ephemeral and deregistered by GitHub
+    [ -n "$RUNNER_JIT_CONFIG" ] || ./config.sh remove --unattended --token "$RUNNER_TOKEN"
 }
 
 trap 'cleanup; exit 130' INT
 trap 'cleanup; exit 143' TERM
 
-./run.sh & wait $!
+RUN_STATUS=0
+if [ -n "$RUNNER_JIT_CONFIG" ]; then
+  ./run.sh --jitconfig "$RUNNER_JIT_CONFIG" & wait $! || RUN_STATUS=$?
+else
+  ./run.sh & wait $! || RUN_STATUS=$?
+fi
+
+# An ephemeral runner exits after its job; report it like a stop signal
+cleanup
+exit $RUN_STATUS
@@ -0,0 +1,509 @@
+"""
+Offline discrete-event simulator for runner fleet policies.
+
+Replays job arrivals and durations exported from the ``runner-status`` table
+through the runner lifecycle the control plane uses (PENDING, DEFERRED,
+IMAGE_CREATING, STARTING, WAITING_FOR_JOB, RUNNING, OFFLINE/FAILED) and
+reports queue wait percentiles, idle runner-minutes and Fargate cost for
+each candidate policy.
+
+    python ecsrunner_cli.py runners export -o runners.jsonl
+    python simulator/fleet_simulator.py runners.jsonl --policies simulator/policies.example.json
+
+Input is JSON lines (plain items or DynamoDB JSON, e.g. an S3 table export)
+or a Parquet archive directory written by the archiver (needs pyarrow).
+"""
+import argparse
+import csv
+import heapq
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda", "control_plane"))
+
+from models import Runner, RunnerState  # noqa: E402
+from store.codec import decode_item  # noqa: E402
+from utilities.backpressure import DEFAULT_ACQUIRE_TIMEOUT, DEFAULT_RATE_LIMITS  # noqa: E402
+
+RUN_TASK_RATE, RUN_TASK_BURST = DEFAULT_RATE_LIMITS[("ecs", "RunTask")]
+
+# Fargate on-demand Linux/x86 prices (us-east-1)
+VCPU_HOUR = 0.04048
+GB_HOUR = 0.004445
+# Fargate bills a minimum of one minute per task
+MIN_BILLED_SECONDS = 60
+
+DEFAULT_CLASS_SIZES = {"default": {"cpu": 1024, "memory": 2048}}
+
+# Archive columns that differ from the table's attribute names
+ARCHIVE_COLUMNS = {
+    "status": "status",
+    "labels": "runner_labels",
+    "image": "image_tag",
+    "runner_class": "class_name",
+    "created_at": "timestamp",
+    "workflow_id": "workflow_job_id",
+}
+
+
+@dataclass(frozen=True)
+class Policy:
+    """One candidate fleet configuration. Durations are in seconds."""
+    name: str = "baseline"
+    runner_ttl_seconds: int = 7200
+    idle_timeout_seconds: int = 900
+    # Idle runners kept per label set, ready for the next job
+    warm_pool: int = 0
+    # Fleet-wide cap on live runners; the rest wait as PENDING
+    max_runners: Optional[int] = None
+    # Overrides of the recorded class sizes ({"large": {"cpu": 4096, "memory": 8192}})
+    class_sizes: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # Job duration scales with (recorded cpu / simulated cpu) ** cpu_scaling
+    cpu_scaling: float = 0.0
+    # Task boot latency: lognormal around the median
+    boot_seconds: float = 45.0
+    boot_sigma: float = 0.3
+    image_build_seconds: float = 600.0
+    # False: the first job of every image waits for a CodeBuild run
+    images_prebuilt: bool = True
+    # RunTask token bucket (production defaults): a launch waits up to the
+    # acquire timeout for a token, else it is DEFERRED
+    run_task_rate: float = RUN_TASK_RATE
+    run_task_burst: float = RUN_TASK_BURST
+    run_task_acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT
+    janitor_interval_seconds: int = 300
+    # Stop runners that come up without a job instead of idling them
+    reclaim_surplus: bool = True
+    seed: int = 1
+
+
+@dataclass(slots=True)
+class Job:
+    arrival: float
+    duration: float
+    key: str
+    runner_class: str
+    image: str
+
+
+class SimRunner:
+    __slots__ = ("key", "runner_class", "image", "state", "created", "launched", "idle_since", "version")
+
+    def __init__(self, key: str, runner_class: str, image: str, now: float):
+        self.key = key
+        self.runner_class = runner_class
+        self.image = image
+        self.state = RunnerState.STARTING
+        self.created = now
+        self.launched: Optional[float] = None
+        self.idle_since: Optional[float] = None
+        # Bumped whenever a scheduled idle check becomes stale
+        self.version = 0
+
+
+# ---- input ----
+
+def _is_attribute_value(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and next(iter(value)) in {
+        "S", "N", "BOOL", "NULL", "M", "L", "SS", "NS", "B", "BS"
+    }
+
+
+def load_runners(path: str) -> Iterator[Runner]:
+    if os.path.isdir(path):
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+        except ImportError:
+            raise SystemExit("Reading a Parquet archive requires pyarrow")
+        root = os.path.join(path, "runners")
+        dataset = ds.dataset(root, format="parquet", partitioning="hive")
+        # Files archived before a column was added lack it: read them with
+        # the union of all file schemas so the column comes back as null
+        schema = pa.unify_schemas([dataset.schema, *(f.physical_schema for f in dataset.get_fragments())])
+        table = ds.dataset(root, schema=schema, format="parquet", partitioning="hive").to_table(
+            columns=[
+                c for c in ("runner_id", "job_started_at", "completed_at", "job_id", "job_status", *ARCHIVE_COLUMNS)
+                if c in schema.names
+            ]
+        )
+        for row in table.to_pylist():
+            yield Runner.from_item({ARCHIVE_COLUMNS.get(k, k): v for k, v in row.items() if v is not None})
+        return
+
+    with open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            item = item.get("Item", item)
+            if any(_is_attribute_value(v) for v in item.values()):
+                item = decode_item(item)
+            yield Runner.from_item(item)
+
+
+def extract_jobs(runners: Iterator[Runner]) -> List[Job]:
+    """
+    One job per runner that ran one: arrival is the runner's creation (the
+    ``queued`` webhook), duration runs from the job's start (the RUNNING
+    status event) to its completion (COMPLETED, else the runner going
+    OFFLINE/FAILED). Runners that never started a job are skipped.
+    """
+    jobs = []
+    for runner in runners:
+        if not runner.job_id or runner.job_started_at is None or runner.completed_at is None:
+            continue
+        if runner.job_status == "reclaimed":
+            continue
+        duration = max(1.0, float(runner.completed_at) - float(runner.job_started_at))
+        key = ",".join(sorted(runner.labels.split(","))) if runner.labels else ""
+        jobs.append(Job(
+            float(runner.created_at), duration, key, runner.runner_class or "default", runner.image or "",
+        ))
+    jobs.sort(key=lambda j: j.arrival)
+    return jobs
+
+
+# ---- simulation ----
+
+class Simulation:
+    """Single run of one policy. Mirrors RunnerController/janitor decisions."""
+
+    def __init__(self, jobs: List[Job], policy: Policy, recorded_sizes: Dict[str, Dict[str, int]]):
+        self.jobs = jobs
+        self.policy = policy
+        self.rng = random.Random(policy.seed)
+        self.sizes = {**recorded_sizes, **policy.class_sizes}
+        self.rate: Dict[str, float] = {}
+        self.scale: Dict[str, float] = {}
+        for cls in {j.runner_class for j in jobs}:
+            size = self.sizes.get(cls) or self.sizes.get("default") or DEFAULT_CLASS_SIZES["default"]
+            recorded = recorded_sizes.get(cls) or size
+            self.rate[cls] = (size["cpu"] / 1024 * VCPU_HOUR + size["memory"] / 1024 * GB_HOUR) / 3600
+            self.scale[cls] = (recorded["cpu"] / size["cpu"]) ** policy.cpu_scaling
+
+        self.events: List[Tuple] = []
+        self.seq = itertools.count()
+        self.queued: Dict[str, deque] = defaultdict(deque)
+        self.idle: Dict[str, List[SimRunner]] = defaultdict(list)
+        self.pending: deque = deque()
+        self.deferred_queue: deque = deque()
+        self.resume_scheduled = False
+        self.built = set()
+        self.seen_keys = set()
+        self.building: Dict[str, List[SimRunner]] = {}
+        self.active = 0
+        self.tokens = policy.run_task_burst
+        self.tokens_at = 0.0
+        self.last_arrival = jobs[-1].arrival if jobs else 0.0
+        if policy.images_prebuilt:
+            self.built.update(j.image for j in jobs)
+
+        self.waits: List[float] = []
+        self.idle_seconds = 0.0
+        self.cost = 0.0
+        self.launched = 0
+        self.deferred = 0
+        self.killed = 0
+        self.max_pending = 0
+
+    def _push(self, at: float, handler, *args) -> None:
+        heapq.heappush(self.events, (at, next(self.seq), handler, args))
+
+    def _tick(self, t: float) -> float:
+        """First janitor pass at or after ``t``."""
+        interval = self.policy.janitor_interval_seconds
+        return math.ceil(t / interval) * interval
+
+    def _next_tick(self, t: float) -> float:
+        """First janitor pass strictly after ``t``."""
+        interval = self.policy.janitor_interval_seconds
+        return (math.floor(t / interval) + 1) * interval
+
+    def run(self) -> Dict[str, Any]:
+        # Arrivals are already sorted: merge them with the event heap instead
+        # of pushing them, which keeps the heap down to in-flight events.
+        events = self.events
+        pop = heapq.heappop
+        for job in self.jobs:
+            while events and events[0][0] <= job.arrival:
+                at, _, handler, args = pop(events)
+                handler(at, *args)
+            self._arrive(job.arrival, job)
+        while events:
+            at, _, handler, args = pop(events)
+            handler(at, *args)
+        return self._report()
+
+    # ---- lifecycle ----
+
+    def _arrive(self, now: float, job: Job) -> None:
+        if job.key not in self.seen_keys:
+            # Warm the pool for a label set once it shows up
+            self.seen_keys.add(job.key)
+            for _ in range(self.policy.warm_pool):
+                self._new_runner(job.key, job.runner_class, job.image, now)
+        # Every queued webhook launches a runner; an idle one may take the job first
+        idle = self.idle.get(job.key)
+        if idle:
+            self._assign(idle.pop(), job, now)
+        else:
+            self.queued[job.key].append(job)
+        self._new_runner(job.key, job.runner_class, job.image, now)
+
+    def _new_runner(self, key: str, runner_class: str, image: str, now: float) -> None:
+        runner = SimRunner(key, runner_class, image, now)
+        cap = self.policy.max_runners
+        if cap is not None and self.active >= cap:
+            runner.state = RunnerState.PENDING
+            self.pending.append(runner)
+            self.max_pending = max(self.max_pending, len(self.pending))
+            return
+        self.active += 1
+        self._provision(runner, now)
+
+    def _provision(self, runner: SimRunner, now: float) -> None:
+        if runner.image not in self.built:
+            runner.state = RunnerState.IMAGE_CREATING
+            waiting = self.building.get(runner.image)
+            if waiting is None:
+                self.building[runner.image] = waiting = []
+                self._push(now + self.policy.image_build_seconds, self._image_built, runner.image)
+            waiting.append(runner)
+            return
+        self._launch(now, runner)
+
+    def _image_built(self, now: float, image: str) -> None:
+        self.built.add(image)
+        for runner in self.building.pop(image, []):
+            self._launch(now, runner)
+
+    def _launch(self, now: float, runner: SimRunner) -> None:
+        p = self.policy
+        self._refill(now)
+        # Like TokenBucket.acquire: wait for a token unless that takes longer
+        # than the timeout. Tokens go negative for launches already waiting.
+        wait = max(0.0, (1 - self.tokens) / p.run_task_rate)
+        if wait > p.run_task_acquire_timeout:
+            # Backpressure: parked until the janitor resumes it
+            runner.state = RunnerState.DEFERRED
+            self.deferred += 1
+            self.deferred_queue.append(runner)
+            self._schedule_resume(now)
+            return
+        self.tokens -= 1
+        self.launched += 1
+        runner.state = RunnerState.STARTING
+        runner.launched = now + wait
+        boot = p.boot_seconds * math.exp(self.rng.gauss(0.0, p.boot_sigma))
+        self._push(runner.launched + boot, self._ready, runner)
+
+    def _refill(self, now: float) -> None:
+        p = self.policy
+        self.tokens = min(p.run_task_burst, self.tokens + (now - self.tokens_at) * p.run_task_rate)
+        self.tokens_at = now
+
+    def _schedule_resume(self, now: float) -> None:
+        if not self.resume_scheduled:
+            self.resume_scheduled = True
+            self._push(self._next_tick(now), self._resume_deferred)
+
+    def _resume_deferred(self, now: float) -> None:
+        """Janitor pass: relaunch deferred runners while RunTask has budget."""
+        self.resume_scheduled = False
+        self._refill(now)
+        while self.deferred_queue and self.tokens >= 1:
+            self._launch(now, self.deferred_queue.popleft())
+        if self.deferred_queue:
+            self._schedule_resume(now)
+
+    def _ready(self, now: float, runner: SimRunner) -> None:
+        runner.state = RunnerState.WAITING_FOR_JOB
+        queue = self.queued.get(runner.key)
+        if queue:
+            self._assign(runner, queue.popleft(), now)
+            return
+        pool = self.idle[runner.key]
+        if len(pool) >= self.policy.warm_pool and self.policy.reclaim_surplus:
+            # Surplus: its job was taken by another runner
+            self._stop(now, runner, RunnerState.OFFLINE)
+            return
+        runner.idle_since = now
+        pool.append(runner)
+        self._schedule_idle_check(runner, now)
+
+    def _schedule_idle_check(self, runner: SimRunner, now: float) -> None:
+        p = self.policy
+        deadline = runner.created + p.runner_ttl_seconds
+        if len(self.idle[runner.key]) > p.warm_pool:
+            deadline = min(deadline, now + p.idle_timeout_seconds)
+        runner.version += 1
+        self._push(self._tick(deadline), self._idle_check, runner, runner.version)
+
+    def _idle_check(self, now: float, runner: SimRunner, version: int) -> None:
+        if version != runner.version or runner.state != RunnerState.WAITING_FOR_JOB:
+            return
+        self.idle[runner.key].remove(runner)
+        self._stop(now, runner, RunnerState.OFFLINE)
+        if now < self.last_arrival and len(self.idle[runner.key]) < self.policy.warm_pool:
+            # Keep the warm pool topped up while there is traffic to serve
+            self._new_runner(runner.key, runner.runner_class, runner.image, now)
+
+    def _assign(self, runner: SimRunner, job: Job, now: float) -> None:
+        if runner.idle_since is not None:
+            self.idle_seconds += now - runner.idle_since
+            runner.idle_since = None
+        runner.version += 1
+        runner.state = RunnerState.RUNNING
+        self.waits.append(now - job.arrival)
+        end = now + job.duration * self.scale[runner.runner_class]
+        # The janitor fails runners that outlive the TTL
+        ttl_end = self._tick(runner.created + self.policy.runner_ttl_seconds)
+        if end > ttl_end:
+            self.killed += 1
+            self._push(ttl_end, self._stop, runner, RunnerState.FAILED)
+        else:
+            self._push(end, self._stop, runner, RunnerState.OFFLINE)
+
+    def _stop(self, now: float, runner: SimRunner, state: RunnerState) -> None:
+        runner.state = state
+        if runner.idle_since is not None:
+            self.idle_seconds += now - runner.idle_since
+            runner.idle_since = None
+        if runner.launched is not None:
+            billed = max(MIN_BILLED_SECONDS, now - runner.launched)
+            self.cost += billed * self.rate[runner.runner_class]
+        self.active -= 1
+        cap = self.policy.max_runners
+        while self.pending and (cap is None or self.active < cap):
+            admitted = self.pending.popleft()
+            self.active += 1
+            self._provision(admitted, now)
+
+    # ---- results ----
+
+    def _report(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def pct(q: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(q * len(waits)))]
+
+        return {
+            "policy": self.policy.name,
+            "jobs": len(waits),
+            "wait_p50": round(pct(0.50), 1),
+            "wait_p90": round(pct(0.90), 1),
+            "wait_p99": round(pct(0.99), 1),
+            "wait_max": round(waits[-1], 1) if waits else 0.0,
+            "idle_runner_minutes": round(self.idle_seconds / 60, 1),
+            "cost_usd": round(self.cost, 2),
+            "runners_launched": self.launched,
+            "deferred_launches": self.deferred,
+            "jobs_killed_by_ttl": self.killed,
+            "max_pending": self.max_pending,
+        }
+
+
+# ---- sweep ----
+
+_JOBS: List[Job] = []
+_SIZES: Dict[str, Dict[str, int]] = {}
+
+
+def _init_worker(jobs: List[Job], sizes: Dict[str, Dict[str, int]]) -> None:
+    global _JOBS, _SIZES
+    _JOBS, _SIZES = jobs, sizes
+
+
+def _simulate(policy: Policy) -> Dict[str, Any]:
+    return Simulation(_JOBS, policy, _SIZES).run()
+
+
+def load_policies(path: Optional[str]) -> List[Policy]:
+    """
+    A JSON list of policies, or an object whose list values form a grid::
+
+        {"runner_ttl_seconds": [3600, 7200], "warm_pool": [0, 1, 2]}
+    """
+    if not path:
+        return [Policy()]
+    with open(path) as fh:
+        spec = json.load(fh)
+    known = {f.name for f in fields(Policy)}
+    entries = spec if isinstance(spec, list) else [spec]
+    policies = []
+    for entry in entries:
+        unknown = set(entry) - known
+        if unknown:
+            raise SystemExit(f"Unknown policy settings: {', '.join(sorted(unknown))}")
+        axes = {k: v for k, v in entry.items() if isinstance(v, list)}
+        for combo in itertools.product(*axes.values()):
+            values = {**entry, **dict(zip(axes, combo))}
+            if "name" not in entry:
+                values["name"] = ",".join(f"{k}={v}" for k, v in zip(axes, combo)) or "baseline"
+            policies.append(Policy(**values))
+    return policies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay runner history through candidate fleet policies.")
+    parser.add_argument("history", help="JSON lines export or Parquet archive directory")
+    parser.add_argument("--policies", help="JSON file with policies or a policy grid")
+    parser.add_argument("--class-sizes", help="Class sizes in effect when the history was recorded (SSM JSON)")
+    parser.add_argument("--since", type=float, help="Only jobs queued at or after this epoch")
+    parser.add_argument("--until", type=float, help="Only jobs queued before this epoch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    args = parser.parse_args()
+
+    sizes = DEFAULT_CLASS_SIZES
+    if args.class_sizes:
+        with open(args.class_sizes) as fh:
+            sizes = {**DEFAULT_CLASS_SIZES, **json.load(fh)}
+
+    started = time.perf_counter()
+    jobs = extract_jobs(load_runners(args.history))
+    if args.since is not None:
+        jobs = [j for j in jobs if j.arrival >= args.since]
+    if args.until is not None:
+        jobs = [j for j in jobs if j.arrival < args.until]
+    policies = load_policies(args.policies)
+    print(f"{len(jobs)} jobs, {len(policies)} policies", file=sys.stderr)
+
+    if args.workers > 1 and len(policies) > 1:
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(jobs, sizes)) as pool:
+            results = list(pool.map(_simulate, policies))
+    else:
+        _init_worker(jobs, sizes)
+        results = [_simulate(p) for p in policies]
+    print(f"simulated in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    if args.format == "json":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(results[0]) if results else [])
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        columns = list(results[0]) if results else []
+        widths = [max(len(c), *(len(str(r[c])) for r in results)) for c in columns]
+        print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+        for r in results:
+            print("  ".join(str(r[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+if __name__ == "__main__":
+    main()
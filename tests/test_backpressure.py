@@ -0,0 +1,234 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("botocore")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "lambda", "control_plane"))
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from utilities import backpressure  # noqa: E402
+from utilities.backpressure import (  # noqa: E402
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimitExceeded,
+    ThrottledClient,
+    TokenBucket,
+)
+from utilities.fault_injection import ThrottlingFaultInjector  # noqa: E402
+
+TASK_ARN = "arn:aws:ecs:us-east-1:123456789012:task/runners/0123456789abcdef"
+
+
+class Clock:
+    """Manual clock; ``sleep`` advances it."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class StubECS:
+    """The part of an ECS client the backpressure layer touches."""
+
+    meta = SimpleNamespace(method_to_api_mapping={"run_task": "RunTask", "stop_task": "StopTask"})
+    exceptions = SimpleNamespace()
+
+    def __init__(self):
+        self.calls = []
+
+    def run_task(self, **kwargs):
+        self.calls.append("RunTask")
+        return {"tasks": [{"taskArn": TASK_ARN}], "failures": []}
+
+    def stop_task(self, **kwargs):
+        self.calls.append("StopTask")
+        return {}
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    backpressure.reset()
+    yield
+    backpressure.reset()
+
+
+def _throttled_ecs(rate=1.0, operations=None):
+    stub = StubECS()
+    injector = ThrottlingFaultInjector(stub, rate=rate, operations=operations, seed=7)
+    return stub, injector, ThrottledClient(injector, "ecs")
+
+
+def test_token_bucket_refills_at_rate():
+    clock = Clock()
+    bucket = TokenBucket(rate=2.0, burst=3.0, clock=clock, sleep=clock.sleep)
+
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == 0.5
+    clock.now += 0.5
+    assert bucket.try_acquire() == 0.0
+
+
+def test_token_bucket_acquire_waits_up_to_timeout():
+    clock = Clock()
+    bucket = TokenBucket(rate=1.0, burst=1.0, clock=clock, sleep=clock.sleep)
+    bucket.try_acquire()
+
+    assert bucket.acquire(timeout=2.0)
+    assert clock.now == 1001.0
+    # The next token is a second away: too long for a half-second timeout
+    assert not bucket.acquire(timeout=0.5)
+    assert clock.now == 1001.0
+
+
+def test_token_bucket_backs_off_and_recovers():
+    bucket = TokenBucket(rate=20.0, burst=40.0)
+
+    for _ in range(10):
+        bucket.on_throttle()
+    assert bucket.rate == 2.0  # min_rate
+
+    for _ in range(5):
+        bucket.on_success()
+    assert bucket.rate == 7.0
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 20.0
+
+
+def test_circuit_breaker_opens_after_threshold_within_window():
+    clock = Clock()
+    breaker = CircuitBreaker("ecs", threshold=3, window=10.0, cooldown=60.0, clock=clock)
+
+    breaker.record_throttle()
+    clock.now += 11  # the first throttle leaves the window
+    breaker.record_throttle()
+    breaker.record_throttle()
+    assert not breaker.is_open
+
+    breaker.record_throttle()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_circuit_breaker_probes_after_cooldown():
+    clock = Clock()
+    breaker = CircuitBreaker("ecs", threshold=1, cooldown=60.0, clock=clock)
+    breaker.record_throttle()
+
+    clock.now += 60
+    assert breaker.allow()
+    # Only one probe per cooldown period
+    assert not breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_throttled_client_opens_breaker_on_injected_throttles():
+    stub, injector, ecs = _throttled_ecs()
+    threshold = backpressure.get_breaker("ecs").threshold
+
+    for _ in range(threshold):
+        with pytest.raises(ClientError) as info:
+            ecs.run_task(cluster="runners")
+        assert backpressure.is_deferrable(info.value)
+    assert backpressure.get_breaker("ecs").is_open
+    assert backpressure.get_bucket("ecs", "RunTask").rate < backpressure.DEFAULT_RATE_LIMITS[("ecs", "RunTask")][0]
+
+    with pytest.raises(CircuitOpenError):
+        ecs.run_task(cluster="runners")
+    assert injector.injected == threshold
+    assert stub.calls == []
+
+
+def test_only_guarded_operations_feed_the_breaker():
+    stub, injector, ecs = _throttled_ecs(operations={"StopTask"})
+    breaker = backpressure.get_breaker("ecs")
+
+    for _ in range(breaker.threshold * 2):
+        with pytest.raises(ClientError):
+            ecs.stop_task(cluster="runners", task="t")
+    assert not breaker.is_open
+
+    for _ in range(breaker.threshold):
+        breaker.record_throttle()
+    injector.rate = 0.0
+    ecs.stop_task(cluster="runners", task="t")
+    # A successful StopTask says nothing about RunTask
+    assert breaker.is_open
+
+
+def test_throttled_client_refuses_when_bucket_is_empty(monkeypatch):
+    monkeypatch.setitem(backpressure.DEFAULT_RATE_LIMITS, ("ecs", "RunTask"), (0.001, 1.0))
+    stub = StubECS()
+    ecs = ThrottledClient(stub, "ecs", acquire_timeout=0.0)
+
+    ecs.run_task(cluster="runners")
+    with pytest.raises(RateLimitExceeded):
+        ecs.run_task(cluster="runners")
+    assert stub.calls == ["RunTask"]
+    # Non-API attributes pass straight through
+    assert ecs.meta is stub.meta
+
+
+def test_provision_defers_throttled_launch(monkeypatch):
+    pytest.importorskip("boto3")
+    pytest.importorskip("pydantic_settings")
+    import runner_controller
+    from config import Settings
+    from models import Runner, RunnerState
+    from runner_controller import RunnerController
+
+    class MemoryStore:
+        def __init__(self):
+            self.saved = []
+
+        def save(self, runner):
+            self.saved.append(runner.state)
+            return runner
+
+    discarded = []
+    monkeypatch.setattr(runner_controller.gh_utils, "create_jit_runner", lambda *a: (42, "jit-config"))
+    monkeypatch.setattr(runner_controller.gh_utils, "delete_runner", lambda *a: discarded.append(a))
+    monkeypatch.setitem(runner_controller._image_uris, "ubuntu-22-04", "registry/runners:ubuntu-22-04")
+    monkeypatch.setitem(runner_controller._task_definitions, "github-runner-ubuntu-22-04", "arn:task-def")
+
+    settings = Settings(
+        cluster="runners",
+        subnets="subnet-1",
+        security_groups="sg-1",
+        github_webhook_secret="secret",
+        runner_table="runner-status",
+        execution_role_arn="arn:aws:iam::123456789012:role/exec",
+        task_role_arn="arn:aws:iam::123456789012:role/task",
+        log_group_name="runners",
+        event_bus_name="default",
+        runner_repository_url="123456789012.dkr.ecr.us-east-1.amazonaws.com/runners",
+    )
+    stub, injector, ecs = _throttled_ecs(operations={"RunTask"})
+    store = MemoryStore()
+    controller = RunnerController(
+        settings, runner_store=store, ecr_client=object(), ecs_client=ecs, codebuild_client=None
+    )
+
+    def provision(runner_id):
+        runner = Runner(id=runner_id, state=RunnerState.STARTING, labels="self-hosted", image="ubuntu-22-04")
+        return controller._provision(runner, "ubuntu:22.04")
+
+    # Throttled after retries, then refused by the open breaker: both park the runner
+    runners = [provision(f"r{i}") for i in range(backpressure.get_breaker("ecs").threshold + 1)]
+
+    assert all(r.state == RunnerState.DEFERRED for r in runners)
+    assert store.saved == [RunnerState.DEFERRED] * len(runners)
+    assert backpressure.get_breaker("ecs").is_open
+    assert len(discarded) == len(runners)
+    assert stub.calls == []
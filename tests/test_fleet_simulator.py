@@ -0,0 +1,201 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The simulator takes its RunTask limits from the control plane's backpressure layer
+pytest.importorskip("botocore")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "simulator"))
+
+from fleet_simulator import (  # noqa: E402
+    DEFAULT_CLASS_SIZES,
+    GB_HOUR,
+    VCPU_HOUR,
+    Job,
+    Policy,
+    Simulation,
+    extract_jobs,
+    load_runners,
+)
+from models import Runner, RunnerState  # noqa: E402
+
+QUEUED = 1_760_000_000
+
+# Fargate cost per second of the default class (1 vCPU, 2 GB)
+DEFAULT_RATE = (VCPU_HOUR + 2 * GB_HOUR) / 3600
+
+
+def _export(tmp_path, runners):
+    """Write runners the way ``runners export`` does: one plain item per line."""
+    path = tmp_path / "runners.jsonl"
+    with open(path, "w") as fh:
+        for runner in runners:
+            fh.write(json.dumps(runner.to_item()) + "\n")
+    return str(path)
+
+
+def _runner(runner_id, **kwargs):
+    return Runner(
+        id=runner_id,
+        state=RunnerState.OFFLINE,
+        labels="self-hosted,image:ubuntu:22.04",
+        image="ubuntu-22-04",
+        created_at=QUEUED,
+        runner_class="large",
+        job_id=f"job-{runner_id}",
+        job_status="success",
+        task_id=f"task-{runner_id}",
+        repo="org/app",
+        **kwargs,
+    )
+
+
+def test_extract_jobs_from_exported_records(tmp_path):
+    runners = [
+        # Booted in 40s, idled 20s, ran the job for 300s, shut down 15s later
+        _runner("ran", started_at=QUEUED + 5, job_started_at=QUEUED + 65, completed_at=QUEUED + 365),
+        # Reaped while idle: never started a job
+        _runner("idle", started_at=QUEUED + 5, completed_at=QUEUED + 905),
+        _runner("reclaimed", started_at=QUEUED + 5, completed_at=QUEUED + 30),
+    ]
+    runners[2].job_status = "reclaimed"
+
+    jobs = extract_jobs(load_runners(_export(tmp_path, runners)))
+
+    assert len(jobs) == 1
+    assert jobs[0].arrival == QUEUED
+    assert jobs[0].duration == 300
+    assert jobs[0].runner_class == "large"
+    assert jobs[0].key == "image:ubuntu:22.04,self-hosted"
+
+
+def test_extract_jobs_from_controller_lifecycle(tmp_path):
+    pytest.importorskip("boto3")
+    pytest.importorskip("pydantic_settings")
+    from config import Settings
+    from runner_controller import RunnerController
+
+    class MemoryStore:
+        def __init__(self):
+            self.items = {}
+
+        def get_runner(self, runner_id):
+            item = self.items.get(runner_id)
+            return Runner.from_item(item) if item else None
+
+        def save(self, runner):
+            self.items[runner.id] = runner.to_item()
+            return runner
+
+        def complete_job(self, runner_id, timestamp):
+            item = self.items[runner_id]
+            if item.get("completed_at") is None or item["completed_at"] > timestamp:
+                item["completed_at"] = timestamp
+
+    class StoppedTasks:
+        def stop_task(self, **kwargs):
+            pass
+
+    settings = Settings(
+        cluster="runners",
+        subnets="subnet-1",
+        security_groups="sg-1",
+        github_webhook_secret="secret",
+        runner_table="runner-status",
+        execution_role_arn="arn:aws:iam::123456789012:role/exec",
+        task_role_arn="arn:aws:iam::123456789012:role/task",
+        log_group_name="runners",
+        event_bus_name="default",
+        runner_repository_url="123456789012.dkr.ecr.us-east-1.amazonaws.com/runners",
+    )
+    store = MemoryStore()
+    controller = RunnerController(
+        settings, runner_store=store, ecr_client=object(), ecs_client=StoppedTasks(), codebuild_client=None
+    )
+
+    for runner_id in ("completed", "offline", "idle"):
+        runner = _runner(runner_id, started_at=QUEUED + 5)
+        runner.state = RunnerState.WAITING_FOR_JOB
+        runner.job_status = "queued"
+        store.save(runner)
+
+    # Status events as StatusService applies them
+    controller.update_runner_state("completed", RunnerState.RUNNING, at=QUEUED + 60)
+    store.complete_job("completed", QUEUED + 180)
+    controller.terminate_runner("completed", at=QUEUED + 200)
+
+    controller.update_runner_state("offline", RunnerState.RUNNING, at=QUEUED + 50)
+    controller.terminate_runner("offline", at=QUEUED + 250)
+
+    controller.terminate_runner("idle", reason="Runner idle timeout", at=QUEUED + 900)
+
+    jobs = extract_jobs(load_runners(_export(tmp_path, (store.get_runner(i) for i in store.items))))
+
+    assert sorted(j.duration for j in jobs) == [120, 200]
+
+
+def _simulate(arrivals, **policy):
+    """Run ``(arrival, duration)`` jobs of one label set with a fixed 45s boot."""
+    jobs = [Job(arrival, duration, "self-hosted", "default", "ubuntu-22-04") for arrival, duration in arrivals]
+    sim = Simulation(jobs, Policy(boot_seconds=45.0, boot_sigma=0.0, **policy), DEFAULT_CLASS_SIZES)
+    return sim, sim.run()
+
+
+def test_pending_runners_admitted_as_capacity_frees():
+    # One runner at a time: each job waits for the previous one to finish
+    # (45s boot + 100s job) before its runner is even launched
+    sim, report = _simulate([(0, 100), (0, 100), (0, 100)], max_runners=1)
+
+    assert sorted(sim.waits) == [45, 190, 335]
+    assert (report["wait_p50"], report["wait_p90"], report["wait_max"]) == (190, 335, 335)
+    assert report["max_pending"] == 2
+    assert report["idle_runner_minutes"] == 0
+    assert sim.cost == pytest.approx(3 * 145 * DEFAULT_RATE)
+
+
+def test_ttl_kills_runner_at_janitor_pass():
+    # Ready at 45, the job would end at 1045; the janitor fails it at 600
+    sim, report = _simulate([(0, 1000)], runner_ttl_seconds=600, janitor_interval_seconds=300)
+
+    assert report["jobs_killed_by_ttl"] == 1
+    assert sim.waits == [45]
+    assert sim.cost == pytest.approx(600 * DEFAULT_RATE)
+
+
+def test_launch_waits_for_token_within_acquire_timeout():
+    # One token at 1/s: the 2nd and 3rd launches wait 1s and 2s, the 4th
+    # would wait 3s and is deferred to the janitor pass at 300
+    sim, report = _simulate(
+        [(0, 100)] * 4, run_task_rate=1.0, run_task_burst=1.0, run_task_acquire_timeout=2.0,
+    )
+
+    assert sorted(sim.waits) == [45, 46, 47, 345]
+    assert report["deferred_launches"] == 1
+    assert report["runners_launched"] == 4
+
+
+def test_deferred_launch_resumes_when_bucket_refills():
+    # A token takes 250s: the 2nd launch is deferred and resumed at 300
+    sim, report = _simulate([(0, 100), (0, 100)], run_task_rate=0.004, run_task_burst=1.0)
+
+    assert sorted(sim.waits) == [45, 345]
+    assert report["deferred_launches"] == 1
+    assert sim.cost == pytest.approx(2 * 145 * DEFAULT_RATE)
+
+
+def test_warm_pool_runner_idles_until_ttl_and_is_replaced():
+    sim, report = _simulate(
+        [(0, 100), (5000, 100)], warm_pool=1, runner_ttl_seconds=3600, idle_timeout_seconds=900,
+    )
+
+    # 0: the pool runner and the job's runner launch; the first ready takes
+    #    the job (45-145), the other idles in the pool past the idle timeout
+    # 3600: the TTL reaps it (idle 3555s) and a replacement launches, idle from 3645
+    # 5000: the replacement takes the 2nd job at once (idle 1355s, job 5000-5100);
+    #    the job's own runner idles from 5045 to its TTL pass at 8700 (3655s)
+    assert sorted(sim.waits) == [0, 45]
+    assert report["runners_launched"] == 4
+    assert sim.idle_seconds == pytest.approx(3555 + 1355 + 3655)
+    assert sim.cost == pytest.approx((145 + 3600 + 1500 + 3700) * DEFAULT_RATE)
@@ -9,11 +9,19 @@ variable "aws_region" {
 }
 
 variable "github_pat" {
-  type = string
+  type    = string
+  default = ""
 }
 
 variable "github_repo" {
-  type = string
+  type    = string
+  default = ""
+}
+
+variable "github_repos" {
+  description = "Additional repositories served: owner/name, or owner/* for a whole organization"
+  type        = list(string)
+  default     = []
 }
 
 variable "runner_image_tag" {
@@ -36,8 +44,9 @@ variable "security_groups" {
 variable "runner_class_sizes" {
   description = "Map of runner class sizes and their cpu/memory settings"
   type = map(object({
-    cpu    = number
-    memory = number
+    cpu          = number
+    memory       = number
+    idle_timeout = optional(number)
   }))
   default = {
     small = {
@@ -70,3 +79,40 @@ variable "image_build_project" {
 
 
 
+
+variable "github_app_id" {
+  description = "GitHub App ID used to authenticate instead of the PAT"
+  type        = string
+  default     = ""
+}
+
+variable "github_app_private_key" {
+  description = "PEM private key of the GitHub App"
+  type        = string
+  default     = ""
+  sensitive   = true
+}
+
+variable "github_app_installation_id" {
+  description = "GitHub App installation ID (looked up per repository owner when empty)"
+  type        = string
+  default     = ""
+}
+
+variable "runner_quotas" {
+  description = "Fair-share quotas: {repos|classes|labels = {<key>|default = {max_runners, vcpus, weight}}}. Empty disables admission control."
+  type        = any
+  default     = {}
+}
+
+variable "archive_bucket" {
+  description = "S3 bucket for the runner record archive (s3://<bucket>/runner-archive). Empty disables archiving."
+  type        = string
+  default     = ""
+}
+
+variable "archive_after_days" {
+  description = "Archive OFFLINE/FAILED runner records older than this many days, then expire them from DynamoDB"
+  type        = number
+  default     = 30
+}